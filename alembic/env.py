@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 from src.benefits.models import *
+from src.storage.models import *
 from src.admin.models import *
 from src.auth.models import *
 from src.analitycs.models import *
@@ -0,0 +1,36 @@
+"""add user directory trigram indexes
+
+Revision ID: e8a6d2c4f193
+Revises: d5e0f3a9b817
+Create Date: 2026-10-18 16:02:10.448725
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a6d2c4f193'
+down_revision: Union[str, None] = 'd5e0f3a9b817'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+user_info_columns = ('full_name', 'position', 'place_of_employment')
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in user_info_columns:
+        op.create_index(f'ix_user_info_table_{column}_trgm', 'user_info_table', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+    op.create_index('ix_user_email_trgm', 'user', ['email'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_email_trgm', table_name='user')
+    for column in user_info_columns:
+        op.drop_index(f'ix_user_info_table_{column}_trgm', table_name='user_info_table')
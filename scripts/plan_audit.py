@@ -0,0 +1,264 @@
+"""Query plan audit.
+
+Seeds a realistic volume of data on the configured database, runs the queries of
+the */utils.py modules through their functions and checks every captured
+statement with EXPLAIN (ANALYZE, BUFFERS). A sequential scan on a large table
+fails the audit unless the scenario reads the whole table by design. Everything
+runs in one transaction that is rolled back, nothing is left in the database.
+
+Every cache is cleared before a scenario, and a scenario that issues no SQL
+fails as well, so no query is skipped by being answered from memory.
+
+    python -m scripts.plan_audit --users 20000 --requests 200000
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import event, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.admin.utils import get_users, get_user
+from src.analitycs.utils import get_analytics, get_requests_series, get_approval_latency, get_usage_by, \
+    get_poll_satisfaction, get_campaign_summary, poll_cache, campaign_summary_cache
+from src.auth.models import User
+from src.auth.utils import verify_user, verify_auth_token, hash_token, check_login_rate, purge_auth_tokens, \
+    user_cache
+from src.benefit_requests.models import RequestFilters, RequestsStatusChange
+from src.benefit_requests.utils import get_all_requests, get_request_info_by_id, get_user_requests_by_id, \
+    get_user_requests_summary, change_request_status, change_requests_status, count_requests
+from src.benefits.utils import get_benefits, get_benefit, invalidate_catalog
+from src.database import engine
+from src.reference import reference
+
+AUDIT_TOKEN = "plan-audit-token"
+
+SEED = [
+    """INSERT INTO "user" (id, email, email_verified, active_user, role_id)
+       SELECT gen_random_uuid(), 'audit' || n || '@example.com', true, true, 2
+       FROM generate_series(1, :users) n""",
+    """INSERT INTO user_info_table (user_id, full_name, place_of_employment, position, employment_date)
+       SELECT id, 'Audit ' || email, 'Office ' || abs(hashtext(email)) % 20, 'Position ' || abs(hashtext(email)) % 50,
+              current_date - abs(hashtext(email)) % 3000
+       FROM "user" WHERE email LIKE 'audit%@example.com'""",
+    """INSERT INTO benefit (name, card_name, text, categories, need_confirmation, need_files)
+       SELECT 'Audit benefit ' || n, 'Audit', 'Audit', ARRAY[1 + n % 4], true, false
+       FROM generate_series(1, :benefits) n""",
+    """WITH users AS (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM "user"
+                      WHERE email LIKE 'audit%@example.com'),
+            benefits AS (SELECT id, row_number() OVER (ORDER BY id) AS rn FROM benefit
+                         WHERE name LIKE 'Audit benefit %'),
+            requests AS (SELECT n, now() - n % 730 * interval '1 day' - n % 1440 * interval '1 minute' AS created_at
+                         FROM generate_series(1, :requests) n)
+       INSERT INTO user_benefit_relation (user_id, benefit_id, created_at, status, status_changed_at)
+       SELECT u.id, b.id, r.created_at, 1 + r.n % 3,
+              CASE WHEN r.n % 3 > 0 THEN r.created_at + r.n % 72 * interval '1 hour' END
+       FROM requests r
+       JOIN users u ON u.rn = 1 + r.n % :users
+       JOIN benefits b ON b.rn = 1 + r.n % :benefits""",
+    """INSERT INTO benefit_request_stats (benefit_id, status, count)
+       SELECT benefit_id, status, count(*) FROM user_benefit_relation GROUP BY benefit_id, status
+       ON CONFLICT (benefit_id, status) DO UPDATE SET count = excluded.count""",
+    """INSERT INTO user_request_stats (user_id, requests)
+       SELECT user_id, count(*) FROM user_benefit_relation GROUP BY user_id
+       ON CONFLICT (user_id) DO UPDATE SET requests = excluded.requests""",
+    """INSERT INTO auth_token (token, user_id, create_date)
+       SELECT encode(sha256(convert_to(random()::text, 'UTF8')), 'hex'), id,
+              now() - abs(hashtext(email)) % 1440 * interval '1 minute'
+       FROM "user" WHERE email LIKE 'audit%@example.com'""",
+    """INSERT INTO auth_token (token, user_id, create_date)
+       SELECT :token_hash, id, now() FROM "user" WHERE email = 'audit1@example.com'""",
+]
+
+SEED_POLL = [
+    """INSERT INTO poll_results (poll_id, user_id, create_date, selected_benefits, satisfaction_rate)
+       SELECT :campaign_id, id, now() - abs(hashtext(email)) % 30 * interval '1 day',
+              ARRAY(SELECT id FROM benefit WHERE name LIKE 'Audit benefit %' ORDER BY id LIMIT 3),
+              abs(hashtext(email)) % 6
+       FROM "user" WHERE email LIKE 'audit%@example.com'""",
+]
+
+ANALYZED = ["user", "user_info_table", "benefit", "user_benefit_relation", "benefit_request_stats",
+            "user_request_stats", "auth_token", "poll_campaign", "poll_results"]
+
+
+def scenarios(context: dict):
+    """(name, query, tables it may scan sequentially)"""
+    user_id = context["user_id"]
+    request_id = context["request_id"]
+    benefit_id = context["benefit_id"]
+    campaign_id = context["campaign_id"]
+    queue = RequestFilters(status=1)
+    return [
+        ("login lookup", lambda session: verify_user("audit1@example.com", session), set()),
+        ("login rate", lambda session: check_login_rate(user_id, session), set()),
+        ("magic link", lambda session: verify_auth_token(AUDIT_TOKEN, session), set()),
+        ("token purge", purge_auth_tokens, set()),
+        ("catalog", lambda session: get_benefits(context["user"], session), set()),
+        ("benefit", lambda session: get_benefit(benefit_id, session), set()),
+        ("my requests", lambda session: get_user_requests_by_id(user_id, session, limit=20), set()),
+        ("my requests by status", lambda session: get_user_requests_by_id(user_id, session, 2, 20), set()),
+        ("my requests summary", lambda session: get_user_requests_summary(user_id, session), set()),
+        ("admin queue", lambda session: get_all_requests(True, session, queue, 50), set()),
+        ("admin queue by benefit",
+         lambda session: get_all_requests(True, session, RequestFilters(benefit_id=benefit_id), 50), set()),
+        ("admin queue count", lambda session: count_requests(RequestFilters(user_id=user_id), session), set()),
+        ("request details", lambda session: get_request_info_by_id(request_id, session), set()),
+        ("apply request", lambda session: change_request_status(request_id, 2, session), set()),
+        ("bulk deny", lambda session: change_requests_status(
+            RequestsStatusChange(action="deny", request_ids=context["request_ids"]), session), set()),
+        ("user directory search", lambda session: get_users(session, "audit4242@", limit=50), set()),
+        ("user profile", lambda session: get_user(str(user_id), session), set()),
+        ("analytics by benefits", lambda session: get_analytics(session), {"user"}),
+        ("requests series", lambda session: get_requests_series("month", session, benefit_id), set()),
+        ("approval latency", lambda session: get_approval_latency(session, True), {"user_benefit_relation"}),
+        ("usage by place", lambda session: get_usage_by("place_of_employment", session),
+         {"user", "user_info_table", "user_request_stats"}),
+        ("usage by tenure", lambda session: get_usage_by("tenure", session),
+         {"user", "user_info_table", "user_request_stats"}),
+        ("poll satisfaction", lambda session: get_poll_satisfaction("week", session, campaign_id=campaign_id),
+         {f"poll_results_{campaign_id}"}),
+        ("campaign summary", lambda session: get_campaign_summary(campaign_id, session),
+         {f"poll_results_{campaign_id}"}),
+    ]
+
+
+def clear_caches():
+    user_cache.invalidate()
+    invalidate_catalog()
+    poll_cache.invalidate()
+    campaign_summary_cache.invalidate()
+    reference.invalidate()
+
+
+def seq_scans(plan: dict):
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+class PlanAudit:
+    def __init__(self, connection, min_rows: int):
+        self.connection = connection
+        self.min_rows = min_rows
+        self.statements: list | None = None
+        event.listen(engine.sync_engine, "before_cursor_execute", self._capture)
+
+    def close(self):
+        event.remove(engine.sync_engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if self.statements is not None and not executemany and \
+                statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "UPDATE", "DELETE"):
+            self.statements.append((statement, parameters))
+
+    async def seed(self, users: int, benefits: int, requests: int) -> dict:
+        values = {"users": users, "benefits": benefits, "requests": requests, "token_hash": hash_token(AUDIT_TOKEN)}
+        for statement in SEED:
+            await self.connection.execute(text(statement), values)
+        campaign_id = (await self.connection.execute(text(
+            "INSERT INTO poll_campaign (name, start_date) VALUES ('Audit campaign', now() - interval '30 days') "
+            "RETURNING id"))).scalar_one()
+        await self.connection.execute(text(
+            f"CREATE TABLE poll_results_{campaign_id} PARTITION OF poll_results FOR VALUES IN ({campaign_id})"))
+        for statement in SEED_POLL:
+            await self.connection.execute(text(statement), {"campaign_id": campaign_id})
+        for table in ANALYZED + [f"poll_results_{campaign_id}"]:
+            await self.connection.execute(text(f'ANALYZE "{table}"'))
+
+        user = (await self.connection.execute(text(
+            "SELECT id, email, email_verified, active_user, role_id FROM \"user\" "
+            "WHERE email = 'audit1@example.com'"))).one()
+        request_ids = (await self.connection.execute(text(
+            "SELECT id FROM user_benefit_relation WHERE user_id = :user_id ORDER BY id LIMIT 20"),
+            {"user_id": user.id})).scalars().all()
+        benefit_id = (await self.connection.execute(text(
+            "SELECT min(id) FROM benefit WHERE name LIKE 'Audit benefit %'"))).scalar_one()
+        return {
+            "user": User(**user._asdict()),
+            "user_id": user.id,
+            "request_id": request_ids[0],
+            "request_ids": request_ids[1:],
+            "benefit_id": benefit_id,
+            "campaign_id": campaign_id,
+        }
+
+    async def large_tables(self) -> set[str]:
+        tables = await self.connection.execute(text(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples >= :min_rows "
+            "AND relnamespace = 'public'::regnamespace"), {"min_rows": self.min_rows})
+        return set(tables.scalars().all())
+
+    async def explain(self, statement: str, parameters) -> dict:
+        nested = await self.connection.begin_nested()
+        try:
+            result = await self.connection.exec_driver_sql(
+                f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+            plan = result.scalar_one()
+        finally:
+            await nested.rollback()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return plan[0]
+
+    async def run(self, context: dict) -> list[str]:
+        large_tables = await self.large_tables()
+        failures = []
+        for name, query, allowed in scenarios(context):
+            clear_caches()
+            self.statements = []
+            nested = await self.connection.begin_nested()
+            session = AsyncSession(bind=self.connection, join_transaction_mode="create_savepoint",
+                                   expire_on_commit=False)
+            try:
+                await query(session)
+            finally:
+                statements, self.statements = self.statements, None
+                await session.close()
+            # plans are taken against the state the queries saw, before their own changes
+            await nested.rollback()
+
+            if not statements:
+                print(f"FAIL {name}: no statements captured")
+                failures.append(f"{name}: no statements captured")
+            for statement, parameters in statements:
+                plan = await self.explain(statement, parameters)
+                scanned = set(seq_scans(plan["Plan"])) & large_tables - allowed
+                verdict = "FAIL" if scanned else "ok"
+                print(f"{verdict:4} {name}: {plan['Execution Time']:.2f} ms, "
+                      f"shared hit {plan['Plan'].get('Shared Hit Blocks', 0)}, "
+                      f"read {plan['Plan'].get('Shared Read Blocks', 0)}")
+                if scanned:
+                    print(f"     seq scan on {', '.join(sorted(scanned))}: {' '.join(statement.split())}")
+                    failures.append(f"{name}: seq scan on {', '.join(sorted(scanned))}")
+        return failures
+
+
+async def main(args) -> int:
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        audit = PlanAudit(connection, args.min_rows)
+        try:
+            context = await audit.seed(args.users, args.benefits, args.requests)
+            failures = await audit.run(context)
+        finally:
+            audit.close()
+            await transaction.rollback()
+    if failures:
+        print(f"\n{len(failures)} plan regression(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nno sequential scans on large tables")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Audit query plans of the utils modules on seeded data")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--benefits", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=100000)
+    parser.add_argument("--min-rows", type=int, default=5000,
+                        help="tables with at least this many rows count as large")
+    sys.exit(asyncio.run(main(parser.parse_args())))
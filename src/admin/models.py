@@ -3,6 +3,8 @@ import datetime
 from dateutil.relativedelta import relativedelta
 import uuid
 
+from pydantic import EmailStr
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 
@@ -14,15 +16,35 @@ class UserInfoBase(SQLModel):
 
 
 class UserInfo(UserInfoBase):
-    email: str = Field(max_length=320, unique=True, index=True, nullable=False)
+    email: EmailStr = Field(max_length=320, unique=True, index=True, nullable=False)
     administration: bool | None = False
 
 
 class UserInfoTable(UserInfoBase, table=True):
     __tablename__ = "user_info_table"
+    __table_args__ = tuple(
+        Index(f"ix_user_info_table_{column}_trgm", column, postgresql_using="gin",
+              postgresql_ops={column: "gin_trgm_ops"})
+        for column in ("full_name", "position", "place_of_employment")
+    )
     user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
 
 
+class UserInfoRead(SQLModel):
+    user_uuid: uuid.UUID
+    email: str
+    full_name: str | None
+    place_of_employment: str | None
+    position: str | None
+    employment_date: str | None
+    administration: bool
+
+
+class UserInfoPage(SQLModel):
+    users: list[UserInfoRead]
+    total: int
+
+
 class UserInfoView:
     user_uuid: uuid.UUID
     email: str
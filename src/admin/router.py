@@ -1,26 +1,40 @@
-from pathlib import Path
+import datetime
+from typing import Literal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from sqlmodel.ext.asyncio.session import AsyncSession
-from starlette.responses import FileResponse
+from starlette import status
 
-from src.admin.models import UserInfo
-from src.admin.utils import get_users, get_user, update_user_info, make_user_inactive, add_user
+from src.admin.models import UserInfo, UserInfoPage
+from src.admin.utils import get_users, get_user, update_user_info, make_user_inactive, add_user, import_users, \
+    parse_users_csv, export_users_statement, USER_EXPORT_HEADER
+from src.analitycs.utils import export_poll_results_statement, POLL_EXPORT_HEADER
 from src.auth.models import User
 from src.auth.utils import get_current_admin, get_current_user
-from src.benefit_requests.utils import get_all_requests, change_request_status, get_request_info_by_id
+from src.benefit_requests.models import RequestFilters, RequestsStatusChange
+from src.benefit_requests.utils import get_all_requests, change_request_status, get_request_info_by_id, \
+    export_requests_statement, REQUEST_EXPORT_HEADER, change_requests_status
 from src.database import get_session
-
-project_root = Path(__file__).resolve().parents[2]
-files_path = project_root / "files/receipts"
+from src.benefits.utils import invalidate_catalog
+from src.export import export_response, ExportFormat
+from src.reference import reference
+from src.storage.backends import get_storage
+from src.storage.responses import PRIVATE_IMMUTABLE
+from src.storage.utils import RECEIPTS
 
 router = APIRouter(prefix="/admin",
                    tags=["Admin"])
 
 
-@router.get("/users")
-async def get_all_users(session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
-    users = await get_users(session)
+@router.get("/users", response_model=UserInfoPage)
+async def get_all_users(search: str | None = Query(default=None, max_length=100),
+                        sort_by: Literal["full_name", "email", "position", "place_of_employment",
+                                         "employment_date"] = "full_name",
+                        desc: bool = False,
+                        limit: int | None = Query(default=None, ge=1, le=500),
+                        offset: int = Query(default=0, ge=0),
+                        session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    users = await get_users(session, search, sort_by, desc, limit, offset)
     return users
 
 
@@ -30,6 +44,28 @@ async def add_new_user(user_info: UserInfo, session: AsyncSession = Depends(get_
     return await add_user(user_info, session, admin.email)
 
 
+@router.post("/users/import")
+async def import_new_users(request: Request, session: AsyncSession = Depends(get_session),
+                           admin: User = Depends(get_current_admin)):
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        file = form.get("file")
+        if file is None or isinstance(file, str):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CSV file is required")
+        rows = parse_users_csv(await file.read())
+    elif content_type.startswith("text/csv"):
+        rows = parse_users_csv(await request.body())
+    else:
+        try:
+            rows = await request.json()
+        except ValueError:
+            rows = None
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a list of users")
+    return await import_users(rows, session, admin.email)
+
+
 @router.get("/users/{uuid}")
 async def get_user_by_uuid(uuid: str, session: AsyncSession = Depends(get_session),
                            admin: User = Depends(get_current_admin)):
@@ -52,10 +88,35 @@ async def remove_user_by_uuid(uuid: str,
     return await make_user_inactive(uuid, session)
 
 
+@router.put("/reference/refresh")
+async def refresh_reference_data(session: AsyncSession = Depends(get_session),
+                                 admin: User = Depends(get_current_admin)):
+    # reloads this worker only, the others catch up on their next periodic
+    # refresh, at most REFERENCE_REFRESH_INTERVAL seconds later
+    await reference.refresh(session)
+    invalidate_catalog()
+    return {
+        "statuses": reference.statuses,
+        "roles": reference.roles,
+        "categories": list(reference.categories.values())
+    }
+
+
 @router.get("/requests")
-async def get_all_benefit_requests(sort_by_date_desc: bool = True, session: AsyncSession = Depends(get_session),
+async def get_all_benefit_requests(sort_by_date_desc: bool = True,
+                                   limit: int = Query(default=50, ge=1, le=500),
+                                   cursor: str | None = None,
+                                   with_total: bool = False,
+                                   filters: RequestFilters = Depends(),
+                                   session: AsyncSession = Depends(get_session),
                                    admin: User = Depends(get_current_admin)):
-    return await get_all_requests(sort_by_date_desc, session)
+    return await get_all_requests(sort_by_date_desc, session, filters, limit, cursor, with_total)
+
+
+@router.put("/requests/status")
+async def change_benefit_requests_status(change: RequestsStatusChange, session: AsyncSession = Depends(get_session),
+                                         admin: User = Depends(get_current_admin)):
+    return await change_requests_status(change, session)
 
 
 @router.get("/requests/{request_id}")
@@ -65,9 +126,8 @@ async def get_request_info(request_id: int, session: AsyncSession = Depends(get_
 
 
 @router.get("/requests/{request_id}/{path}")
-async def get_request_file(path: str):
-    img_path = Path(files_path / path)
-    return FileResponse(img_path)
+async def get_request_file(path: str, request: Request):
+    return await get_storage(RECEIPTS).response(path, request, PRIVATE_IMMUTABLE)
 
 
 @router.put("/requests/{request_id}/apply")
@@ -80,3 +140,32 @@ async def apply_request(request_id: int, session: AsyncSession = Depends(get_ses
 async def deny_request(request_id: int, session: AsyncSession = Depends(get_session),
                        admin: User = Depends(get_current_admin)):
     return await change_request_status(request_id, 3, session)
+
+
+@router.get("/export/requests")
+async def export_requests(export_format: ExportFormat = Query(default="csv", alias="format"),
+                          sort_by_date_desc: bool = True,
+                          filters: RequestFilters = Depends(),
+                          admin: User = Depends(get_current_admin)):
+    return export_response(export_requests_statement(sort_by_date_desc, filters), REQUEST_EXPORT_HEADER,
+                           export_format, "requests")
+
+
+@router.get("/export/users")
+async def export_users(export_format: ExportFormat = Query(default="csv", alias="format"),
+                       search: str | None = Query(default=None, max_length=100),
+                       sort_by: Literal["full_name", "email", "position", "place_of_employment",
+                                        "employment_date"] = "full_name",
+                       desc: bool = False,
+                       admin: User = Depends(get_current_admin)):
+    return export_response(export_users_statement(search, sort_by, desc), USER_EXPORT_HEADER, export_format, "users")
+
+
+@router.get("/export/poll-results")
+async def export_poll_results(export_format: ExportFormat = Query(default="csv", alias="format"),
+                              date_from: datetime.date | None = None,
+                              date_to: datetime.date | None = None,
+                              campaign_id: int | None = None,
+                              admin: User = Depends(get_current_admin)):
+    return export_response(export_poll_results_statement(date_from, date_to, campaign_id), POLL_EXPORT_HEADER,
+                           export_format, "poll-results")
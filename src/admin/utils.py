@@ -1,16 +1,75 @@
+import csv
+import datetime
+import io
+import uuid
+
 import sqlalchemy
+from pydantic import ValidationError
+from sqlalchemy import insert, func, or_, union
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 from starlette.exceptions import HTTPException
 
 from src.admin.models import UserInfoTable, UserInfoView, UserInfo
-from src.auth.models import User
-from src.auth.utils import send_email, generate_auth_link
+from src.auth.models import User, AuthToken
+from src.auth.utils import send_email, generate_auth_link, create_auth_token, build_email, send_emails, \
+    invalidate_user_cache
+
+IMPORT_BATCH_SIZE = 1000
+
+
+USER_SORT_COLUMNS = {
+    "full_name": UserInfoTable.full_name,
+    "email": User.email,
+    "position": UserInfoTable.position,
+    "place_of_employment": UserInfoTable.place_of_employment,
+    "employment_date": UserInfoTable.employment_date,
+}
+
+
+USER_EXPORT_HEADER = ["id", "email", "full_name", "position", "place_of_employment", "employment_date",
+                      "administration"]
+
+
+def search_users(statement, search: str | None):
+    statement = statement.join(UserInfoTable).where(User.active_user == True)
+    if search:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        # an OR spanning both tables of the join cannot use their trigram indexes,
+        # each table is searched on its own and the matching ids are combined.
+        # Patterns shorter than 3 characters have no trigrams and scan anyway
+        matches = union(
+            select(UserInfoTable.user_id).where(or_(UserInfoTable.full_name.ilike(pattern),
+                                                    UserInfoTable.position.ilike(pattern),
+                                                    UserInfoTable.place_of_employment.ilike(pattern))),
+            select(User.id).where(User.email.ilike(pattern)),
+        )
+        statement = statement.where(User.id.in_(matches))
+    return statement
+
+
+def sort_users(statement, sort_by: str, desc: bool):
+    sort_column = USER_SORT_COLUMNS[sort_by]
+    sort_column = sort_column.desc().nulls_last() if desc else sort_column.asc().nulls_last()
+    return statement.order_by(sort_column, User.id)
+
+
+def export_users_statement(search: str | None = None, sort_by: str = "full_name", desc: bool = False):
+    statement = select(User.id, User.email, UserInfoTable.full_name, UserInfoTable.position,
+                       UserInfoTable.place_of_employment, UserInfoTable.employment_date, User.role_id == 1)
+    return sort_users(search_users(statement, search), sort_by, desc)
+
 
+async def get_users(session: AsyncSession, search: str | None = None, sort_by: str = "full_name",
+                    desc: bool = False, limit: int | None = None, offset: int = 0):
+    statement = search_users(select(User, UserInfoTable), search)
+    page = sort_users(statement, sort_by, desc).offset(offset)
+    if limit is not None:
+        page = page.limit(limit)
 
-async def get_users(session: AsyncSession):
-    users = await session.exec(select(User, UserInfoTable).join(UserInfoTable).where(User.active_user == True))
+    users = await session.exec(page)
     users = users.fetchall()
     users = [UserInfoView(
         user_uuid=user.id,
@@ -21,7 +80,15 @@ async def get_users(session: AsyncSession):
         employment_date=user_info.employment_date,
         administration=user.role_id,
     ) for user, user_info in users]
-    return users
+    if limit is None and offset == 0:
+        total = len(users)
+    else:
+        total = await session.exec(select(func.count()).select_from(statement.subquery()))
+        total = total.one()
+    return {
+        "users": users,
+        "total": total
+    }
 
 
 async def get_user(uuid: str, session: AsyncSession):
@@ -68,6 +135,7 @@ async def update_user_info(uuid: str, user_info: UserInfo, session: AsyncSession
     session.add(user_info_db)
     session.add(user_db)
     await session.commit()
+    invalidate_user_cache(user_db.id)
     return UserInfoView(
         user_uuid=user_db.id,
         email=user_db.email,
@@ -85,6 +153,7 @@ async def make_user_inactive(uuid: str, session: AsyncSession):
     user.active_user = False
     session.add(user)
     await session.commit()
+    invalidate_user_cache(user.id)
     return {"success": f"User {user.email} is deleted"}
 
 
@@ -104,3 +173,71 @@ async def add_user(user_info: UserInfo, session: AsyncSession, email_from: str):
     session.add(user_info_table)
     await session.commit()
     return {"success": f"Message has been sent to {user_info.email}"}
+
+
+def parse_users_csv(content: bytes) -> list[dict]:
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    return [{key: value or None for key, value in row.items()} for row in reader]
+
+
+async def import_users(rows: list[dict], session: AsyncSession, email_from: str):
+    report = []
+    valid_rows = {}
+    for row_number, row in enumerate(rows, start=1):
+        email = row.get("email") if isinstance(row, dict) else None
+        try:
+            user_info = UserInfo.model_validate(row)
+        except ValidationError as error:
+            report.append({"row": row_number, "email": email, "status": "error",
+                           "detail": error.errors(include_url=False, include_context=False)})
+            continue
+        if user_info.email in valid_rows:
+            report.append({"row": row_number, "email": user_info.email, "status": "error",
+                           "detail": "Duplicate email in import"})
+            continue
+        valid_rows[user_info.email] = (row_number, user_info)
+
+    existing_emails = set()
+    for emails in _batches(list(valid_rows)):
+        existing = await session.exec(select(User.email).where(User.email.in_(emails)))
+        existing_emails.update(existing.all())
+    for email in existing_emails:
+        row_number, _ = valid_rows.pop(email)
+        report.append({"row": row_number, "email": email, "status": "error",
+                       "detail": f"User with email {email} already exists"})
+
+    users, users_info, auth_tokens, messages = [], [], [], []
+    now = datetime.datetime.now()
+    for row_number, user_info in valid_rows.values():
+        user_id = uuid.uuid4()
+        users.append({"id": user_id, "email": user_info.email, "email_verified": False, "active_user": True,
+                      "role_id": 1 if user_info.administration else 2})
+        users_info.append({"user_id": user_id, **user_info.model_dump(exclude={"email", "administration"})})
+        auth_token, auth_link = create_auth_token(user_id)
+        auth_tokens.append({"token": auth_token.token, "user_id": user_id, "create_date": now})
+        messages.append(build_email(user_info.email, auth_link, 'invite', email_from))
+        report.append({"row": row_number, "email": user_info.email, "status": "created", "user_uuid": user_id})
+
+    try:
+        for model, values in ((User, users), (UserInfoTable, users_info), (AuthToken, auth_tokens)):
+            for batch in _batches(values):
+                await session.exec(insert(model).values(batch))
+        await session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Users were added concurrently, nothing has been imported")
+
+    await send_emails(messages)
+
+    report.sort(key=lambda item: item["row"])
+    return {
+        "created": len(users),
+        "failed": len(report) - len(users),
+        "rows": report
+    }
+
+
+def _batches(values: list, size: int = IMPORT_BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
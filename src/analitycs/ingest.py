@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from sqlalchemy.dialects.postgresql import insert
+
+from src.analitycs.models import PollResults
+from src.config import POLL_BATCH_SIZE, POLL_FLUSH_INTERVAL
+from src.database import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+class PollBuffer:
+    """Collects poll answers and writes them with multi-row inserts.
+
+    submit() returns only after the batch holding the answer is committed, so an
+    acknowledged answer is durable. It returns None when the user has already
+    answered the current poll.
+    """
+
+    def __init__(self, batch_size: int = POLL_BATCH_SIZE, interval: float = POLL_FLUSH_INTERVAL):
+        self._batch_size = batch_size
+        self._interval = interval / 1000
+        self._pending: dict = {}
+        self._full: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._stopping = False
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # the loop finishes the batch in flight and flushes the rest before it exits
+        self._stopping = True
+        self._full.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._fail(list(self._pending.values()), RuntimeError("Poll buffer is stopped"))
+        self._pending.clear()
+
+    async def submit(self, poll_results: PollResults) -> PollResults | None:
+        key = (poll_results.user_id, poll_results.poll_id)
+        if key in self._pending:
+            return None
+        if self._interval <= 0:
+            return (await self._write({key: poll_results})).get(key)
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = (poll_results, future)
+        if len(self._pending) >= self._batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self._flush()
+            if self._stopping:
+                return
+
+    async def _flush(self):
+        while self._pending:
+            keys = list(self._pending)[:self._batch_size]
+            batch = {key: self._pending.pop(key) for key in keys}
+            try:
+                inserted = await self._write({key: poll_results for key, (poll_results, future) in batch.items()})
+            except asyncio.CancelledError:
+                self._fail(list(batch.values()), RuntimeError("Poll buffer is stopped"))
+                raise
+            except Exception as e:
+                logger.exception("Batch of %d poll answers could not be written", len(batch))
+                self._fail(list(batch.values()), e)
+                continue
+            for key, (poll_results, future) in batch.items():
+                if not future.done():
+                    future.set_result(inserted.get(key))
+
+    @staticmethod
+    def _fail(entries: list, error: Exception):
+        for poll_results, future in entries:
+            if not future.done():
+                future.set_exception(error)
+
+    @staticmethod
+    async def _write(batch: dict) -> dict:
+        values = [poll_results.model_dump(exclude={"id"}) for poll_results in batch.values()]
+        async with async_session_maker() as session:
+            rows = await session.exec(insert(PollResults).values(values).on_conflict_do_nothing(
+                index_elements=[PollResults.user_id, PollResults.poll_id]).returning(
+                PollResults.id, PollResults.user_id, PollResults.poll_id))
+            rows = rows.all()
+            await session.commit()
+        inserted = {}
+        for row_id, user_id, poll_id in rows:
+            poll_results = batch[(user_id, poll_id)]
+            poll_results.id = row_id
+            inserted[(user_id, poll_id)] = poll_results
+        return inserted
+
+
+poll_buffer = PollBuffer()
@@ -1,7 +1,8 @@
 import datetime
 import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field as PydanticField, field_validator
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlmodel import SQLModel, Field, Column, Integer
 
@@ -10,12 +11,46 @@ class PollStatus(SQLModel, table=True):
     __tablename__ = "poll_status"
 
     status: bool = Field(default=False, primary_key=True)
+    poll_id: int = Field(default=0)
+
+
+class PollCampaign(SQLModel, table=True):
+    __tablename__ = "poll_campaign"
+
+    id: int | None = Field(default=None, primary_key=True)
+    name: str = Field(max_length=100, nullable=False)
+    start_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    end_date: datetime.datetime | None = Field(default=None, nullable=True)
+    benefits: list[int] | None = Field(sa_column=Column(ARRAY(Integer), nullable=True), default=None)
+
+    def is_running(self, now: datetime.datetime) -> bool:
+        return self.start_date <= now and (self.end_date is None or now < self.end_date)
+
+
+class PollCampaignCreate(BaseModel):
+    name: str = PydanticField(max_length=100)
+    start_date: datetime.datetime | None = None
+    end_date: datetime.datetime | None = None
+    benefits: list[int] | None = None
+
+    @field_validator("start_date", "end_date")
+    @classmethod
+    def to_local_time(cls, value: datetime.datetime | None):
+        # campaign dates are stored as naive local time, like datetime.now()
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone().replace(tzinfo=None)
+        return value
 
 
 class PollResults(SQLModel, table=True):
     __tablename__ = "poll_results"
+    __table_args__ = (
+        UniqueConstraint("user_id", "poll_id", name="uq_poll_results_user_id_poll_id"),
+        {"postgresql_partition_by": "LIST (poll_id)"},
+    )
 
-    id: int | None = Field(default=None, primary_key=True)
+    id: int | None = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
+    poll_id: int = Field(foreign_key="poll_campaign.id", primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id")
     create_date: datetime.datetime | None = Field(default_factory=datetime.datetime.now)
     selected_benefits: list[int] | None = Field(sa_column=Column(ARRAY(Integer), nullable=True), default=None)
@@ -25,3 +60,18 @@ class PollResults(SQLModel, table=True):
 class PollSchema(BaseModel):
     selected_benefits: list[int]
     satisfaction_rate: int
+
+
+class BenefitRequestStats(SQLModel, table=True):
+    __tablename__ = "benefit_request_stats"
+
+    benefit_id: int = Field(foreign_key="benefit.id", primary_key=True, ondelete="CASCADE")
+    status: int = Field(foreign_key="benefit_statuses.id", primary_key=True)
+    count: int = Field(default=0)
+
+
+class UserRequestStats(SQLModel, table=True):
+    __tablename__ = "user_request_stats"
+
+    user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    requests: int = Field(default=0)
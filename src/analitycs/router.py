@@ -1,8 +1,13 @@
+import datetime
+from typing import Literal
+
 from fastapi import APIRouter, Depends
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.analitycs.models import PollSchema
-from src.analitycs.utils import get_current_poll_status, set_current_poll_status, add_poll_results, get_analytics
+from src.analitycs.models import PollSchema, PollCampaignCreate
+from src.analitycs.utils import get_current_poll_status, set_current_poll_status, add_poll_results, get_analytics, \
+    get_requests_series, get_approval_latency, get_usage_by, get_poll_satisfaction, start_campaign, get_campaigns, \
+    get_campaign_summary
 from src.auth.models import User
 from src.auth.utils import get_current_admin, get_current_user
 from src.database import get_session
@@ -22,6 +27,23 @@ async def set_poll_status(status: bool, session: AsyncSession = Depends(get_sess
     return await set_current_poll_status(status, session)
 
 
+@router.get("/campaigns")
+async def get_poll_campaigns(session: AsyncSession = Depends(get_session), admin: User = Depends(get_current_admin)):
+    return await get_campaigns(session)
+
+
+@router.post("/campaigns")
+async def add_poll_campaign(campaign_data: PollCampaignCreate, session: AsyncSession = Depends(get_session),
+                            admin: User = Depends(get_current_admin)):
+    return await start_campaign(campaign_data, session)
+
+
+@router.get("/campaigns/{campaign_id}/summary")
+async def get_poll_campaign_summary(campaign_id: int, session: AsyncSession = Depends(get_session),
+                                    admin: User = Depends(get_current_admin)):
+    return await get_campaign_summary(campaign_id, session)
+
+
 @router.post("/poll")
 async def take_poll(poll_data: PollSchema, session: AsyncSession = Depends(get_session),
                     user: User = Depends(get_current_user)):
@@ -32,3 +54,44 @@ async def take_poll(poll_data: PollSchema, session: AsyncSession = Depends(get_s
 async def get_analytics_by_benefits(session: AsyncSession = Depends(get_session),
                                     admin: User = Depends(get_current_admin)):
     return await get_analytics(session)
+
+
+@router.get("/requests-series")
+async def get_analytics_requests_series(period: Literal["week", "month", "quarter", "year"] = "month",
+                                        benefit_id: int | None = None,
+                                        date_from: datetime.date | None = None,
+                                        date_to: datetime.date | None = None,
+                                        session: AsyncSession = Depends(get_session),
+                                        admin: User = Depends(get_current_admin)):
+    return await get_requests_series(period, session, benefit_id, date_from, date_to)
+
+
+@router.get("/approval-latency")
+async def get_analytics_approval_latency(by_benefit: bool = False,
+                                         date_from: datetime.date | None = None,
+                                         date_to: datetime.date | None = None,
+                                         session: AsyncSession = Depends(get_session),
+                                         admin: User = Depends(get_current_admin)):
+    return await get_approval_latency(session, by_benefit, date_from, date_to)
+
+
+@router.get("/by-place")
+async def get_analytics_by_place(session: AsyncSession = Depends(get_session),
+                                 admin: User = Depends(get_current_admin)):
+    return await get_usage_by("place_of_employment", session)
+
+
+@router.get("/by-tenure")
+async def get_analytics_by_tenure(session: AsyncSession = Depends(get_session),
+                                  admin: User = Depends(get_current_admin)):
+    return await get_usage_by("tenure", session)
+
+
+@router.get("/poll-satisfaction")
+async def get_analytics_poll_satisfaction(period: Literal["week", "month", "quarter", "year"] = "month",
+                                          date_from: datetime.date | None = None,
+                                          date_to: datetime.date | None = None,
+                                          campaign_id: int | None = None,
+                                          session: AsyncSession = Depends(get_session),
+                                          admin: User = Depends(get_current_admin)):
+    return await get_poll_satisfaction(period, session, date_from, date_to, campaign_id)
@@ -1,94 +1,259 @@
+import datetime
+import uuid
+
+from sqlalchemy import func, case, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 from starlette.exceptions import HTTPException
 
-from src.analitycs.models import PollStatus, PollSchema, PollResults
+from src.analitycs.ingest import poll_buffer
+from src.analitycs.models import PollStatus, PollSchema, PollResults, BenefitRequestStats, UserRequestStats, \
+    PollCampaign, PollCampaignCreate
+from src.admin.models import UserInfoTable
 from src.auth.models import User
 from src.benefit_requests.models import UserBenefitRelation
 from src.benefits.models import Benefit
+from src.cache import TTLCache
+from src.config import POLL_CACHE_TTL, POLL_SUMMARY_CACHE_TTL
+
+
+poll_cache = TTLCache(POLL_CACHE_TTL)
+campaign_summary_cache = TTLCache(POLL_SUMMARY_CACHE_TTL)
+
+
+async def get_current_campaign(session: AsyncSession) -> PollCampaign | None:
+    """Campaign that takes answers while the poll is open, cached between submissions."""
+    campaign = poll_cache.get("campaign", False)
+    if campaign is False:
+        statement = select(PollCampaign).join(PollStatus, PollStatus.poll_id == PollCampaign.id).where(
+            PollStatus.status == True)
+        campaign = await session.exec(statement)
+        campaign = campaign.first()
+        if campaign is not None:
+            campaign = PollCampaign(**campaign.model_dump())
+        poll_cache.set("campaign", campaign)
+    return campaign
+
+
+async def get_benefit_ids(session: AsyncSession) -> frozenset[int]:
+    benefit_ids = poll_cache.get("benefit_ids")
+    if benefit_ids is None:
+        benefit_ids = await session.exec(select(Benefit.id))
+        benefit_ids = frozenset(benefit_ids.all())
+        poll_cache.set("benefit_ids", benefit_ids)
+    return benefit_ids
+
+
+def invalidate_benefit_ids():
+    poll_cache.invalidate("benefit_ids")
 
 
 async def get_current_poll_status(session: AsyncSession):
-    poll_status = await session.exec(select(PollStatus))
-    poll_status = poll_status.first()
+    campaign = await get_current_campaign(session)
+    return {
+        "is_poll_active": campaign is not None and campaign.is_running(datetime.datetime.now()),
+        "campaign": campaign
+    }
 
-    return {"is_poll_active": poll_status.status}
 
+async def create_poll_partition(campaign_id: int, session: AsyncSession):
+    await session.exec(text(f"CREATE TABLE IF NOT EXISTS poll_results_{int(campaign_id)} "
+                            f"PARTITION OF poll_results FOR VALUES IN ({int(campaign_id)})"))
 
-async def set_current_poll_status(new_status: bool, session: AsyncSession):
-    poll_status = await session.exec(select(PollStatus))
+
+async def start_campaign(campaign_data: PollCampaignCreate, session: AsyncSession):
+    if campaign_data.benefits is not None and not await get_benefit_ids(session) >= set(campaign_data.benefits):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid benefit id")
+    campaign = PollCampaign(**campaign_data.model_dump(exclude_none=True))
+    if campaign.end_date is not None and campaign.end_date <= campaign.start_date:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Campaign ends before it starts")
+
+    poll_status = await session.exec(select(PollStatus).with_for_update())
     poll_status = poll_status.first()
-    poll_status.status = new_status
+    await end_campaign(poll_status, session)
+    session.add(campaign)
+    await session.flush()
+    await create_poll_partition(campaign.id, session)
+    poll_status.poll_id = campaign.id
+    poll_status.status = True
     session.add(poll_status)
     await session.commit()
+    poll_cache.invalidate("campaign")
+    return campaign
+
+
+async def end_campaign(poll_status: PollStatus, session: AsyncSession):
+    if not poll_status.status:
+        return
+    now = datetime.datetime.now()
+    campaign = await session.get(PollCampaign, poll_status.poll_id)
+    if campaign is not None and (campaign.end_date is None or campaign.end_date > now):
+        campaign.end_date = max(now, campaign.start_date)
+        session.add(campaign)
+    poll_status.status = False
+    session.add(poll_status)
+
+
+async def set_current_poll_status(new_status: bool, session: AsyncSession):
+    if new_status:
+        # opening the poll without a campaign starts one over all benefits
+        poll_status = await get_current_poll_status(session)
+        if not poll_status["is_poll_active"]:
+            await start_campaign(PollCampaignCreate(name=f"Опрос {datetime.date.today().isoformat()}"), session)
+    else:
+        poll_status = await session.exec(select(PollStatus).with_for_update())
+        await end_campaign(poll_status.first(), session)
+        await session.commit()
+        poll_cache.invalidate("campaign")
     # if new_status = true send message to all users
 
-    return {"is_poll_active": poll_status.status}
+    return {"is_poll_active": new_status}
+
+
+async def get_campaigns(session: AsyncSession):
+    campaigns = await session.exec(select(PollCampaign).order_by(PollCampaign.id.desc()))
+    return campaigns.all()
+
+
+async def get_campaign_summary(campaign_id: int, session: AsyncSession):
+    summary = campaign_summary_cache.get(campaign_id)
+    if summary is not None:
+        return summary
+    campaign = await session.get(PollCampaign, campaign_id)
+    if campaign is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Campaign not found")
+
+    # every query is pinned to one poll_id, so it reads a single partition
+    rates = await session.exec(select(PollResults.satisfaction_rate, func.count()).where(
+        PollResults.poll_id == campaign_id).group_by(PollResults.satisfaction_rate))
+    distribution = {rate: 0 for rate in range(6)}
+    for rate, responses in rates.all():
+        distribution[rate] = responses
+    responses = sum(distribution.values())
+
+    selected = select(func.unnest(PollResults.selected_benefits).label("benefit_id")).where(
+        PollResults.poll_id == campaign_id).subquery()
+    votes = await session.exec(select(selected.c.benefit_id, Benefit.name, func.count().label("votes")).outerjoin(
+        Benefit, Benefit.id == selected.c.benefit_id).group_by(selected.c.benefit_id, Benefit.name).order_by(
+        func.count().desc(), selected.c.benefit_id))
+
+    summary = {
+        "campaign": campaign,
+        "responses": responses,
+        "average": round(sum(rate * count for rate, count in distribution.items()) / responses, 2)
+        if responses else None,
+        "distribution": distribution,
+        "benefits": [{"benefit_id": benefit_id, "name": name, "votes": count}
+                     for benefit_id, name, count in votes.all()]
+    }
+    campaign_summary_cache.set(campaign_id, summary)
+    return summary
 
 
 async def add_poll_results(poll_data: PollSchema, user_id: str, session: AsyncSession):
-    await validate_poll_results(poll_data, session)
-    poll_results = PollResults(user_id=user_id, **poll_data.model_dump())
-    session.add(poll_results)
-    await session.commit()
+    campaign = await validate_poll_results(poll_data, session)
+    poll_results = PollResults(user_id=uuid.UUID(user_id), poll_id=campaign.id, **poll_data.model_dump())
+    # the buffer writes through its own sessions, the request's connection
+    # goes back to the pool instead of idling until the batch is flushed
+    await session.close()
+    poll_results = await poll_buffer.submit(poll_results)
+    if poll_results is None:
+        raise HTTPException(status.HTTP_409_CONFLICT, detail="Poll is already taken")
     return poll_results
 
 
-async def validate_poll_results(poll_data: PollSchema, session: AsyncSession):
-    poll_status = await get_current_poll_status(session)
-    if not poll_status["is_poll_active"]:
+async def validate_poll_results(poll_data: PollSchema, session: AsyncSession) -> PollCampaign:
+    campaign = await get_current_campaign(session)
+    if campaign is None or not campaign.is_running(datetime.datetime.now()):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Poll is currently inactive")
     if poll_data.satisfaction_rate < 0 or poll_data.satisfaction_rate > 5:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid satisfaction_rate")
 
-    benefits_ids = await session.exec(select(Benefit.id))
-    benefits_ids = benefits_ids.all()
-    for benefit in poll_data.selected_benefits:
-        if benefit not in benefits_ids:
-            raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid benefit id")
+    benefit_ids = await get_benefit_ids(session) if campaign.benefits is None else set(campaign.benefits)
+    if not benefit_ids >= set(poll_data.selected_benefits):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid benefit id")
+    return campaign
+
+
+async def record_request_stats(session: AsyncSession, status_deltas: dict[tuple[int, int], int],
+                               user_deltas: dict[uuid.UUID, int] = None):
+    """Add deltas to the request counters, keyed by (benefit_id, status) and by user id.
+
+    Runs in the caller's transaction, so the counters commit together with the requests.
+    Rows are upserted in key order, so concurrent callers lock them in the same
+    order and cannot deadlock each other.
+    """
+    for (benefit_id, request_status), delta in sorted(status_deltas.items()):
+        if delta == 0:
+            continue
+        await session.exec(insert(BenefitRequestStats).values(
+            benefit_id=benefit_id, status=request_status, count=delta).on_conflict_do_update(
+            index_elements=[BenefitRequestStats.benefit_id, BenefitRequestStats.status],
+            set_={"count": BenefitRequestStats.count + delta}))
+    for user_id, delta in sorted((user_deltas or {}).items()):
+        if delta == 0:
+            continue
+        await session.exec(insert(UserRequestStats).values(user_id=user_id, requests=delta).on_conflict_do_update(
+            index_elements=[UserRequestStats.user_id],
+            set_={"requests": UserRequestStats.requests + delta}))
+
+
+async def record_request_created(session: AsyncSession, benefit_id: int, user_id: uuid.UUID, request_status: int):
+    await record_request_stats(session, {(benefit_id, request_status): 1}, {user_id: 1})
+
+
+async def record_status_change(session: AsyncSession, benefit_id: int, old_status: int, new_status: int):
+    if old_status != new_status:
+        await record_request_stats(session, {(benefit_id, old_status): -1, (benefit_id, new_status): 1})
 
 
 async def get_analytics(session: AsyncSession):
-    employees = await session.exec(select(User).where(User.active_user and User.email_verified))
-    employees = employees.all()
-    if len(employees) == 0:
+    employees_count = await session.exec(select(func.count()).select_from(User).
+                                         where(User.active_user == True).
+                                         where(User.email_verified == True))
+    employees_count = employees_count.one()
+    if employees_count == 0:
         return HTTPException(status.HTTP_400_BAD_REQUEST, detail="No employees yet")
-    benefit_users = set()
 
-    benefits = await session.exec(select(Benefit))
+    benefits = await session.exec(select(Benefit.id, Benefit.name))
     benefits = benefits.all()
     benefits_dict = {}
-    for benefit in benefits:
-        benefits_dict[benefit.name] = {
+    benefit_names = {}
+    for benefit_id, benefit_name in benefits:
+        benefit_names[benefit_id] = benefit_name
+        benefits_dict[benefit_name] = {
             "Ожидает": 0,
             "Одобрено": 0,
             "Отказано": 0
         }
 
-    requests = await session.exec(
-        select(UserBenefitRelation, Benefit).join(Benefit, Benefit.id == UserBenefitRelation.benefit_id))
-    requests = requests.all()
+    stats = await session.exec(select(BenefitRequestStats))
+    stats = stats.all()
 
     requests_approved = 0
     requests_denied = 0
     requests_waiting = 0
 
-    for request, benefit in requests:
-        benefit_users.add(request.user_id)
-        match request.status:
+    for stat in stats:
+        benefit_name = benefit_names.get(stat.benefit_id)
+        if benefit_name is None:
+            continue
+        match stat.status:
             case 1:
-                requests_waiting += 1
-                benefits_dict[benefit.name]["Ожидает"] += 1
+                requests_waiting += stat.count
+                benefits_dict[benefit_name]["Ожидает"] += stat.count
             case 2:
-                requests_approved += 1
-                benefits_dict[benefit.name]["Одобрено"] += 1
+                requests_approved += stat.count
+                benefits_dict[benefit_name]["Одобрено"] += stat.count
             case 3:
-                requests_denied += 1
-                benefits_dict[benefit.name]["Отказано"] += 1
+                requests_denied += stat.count
+                benefits_dict[benefit_name]["Отказано"] += stat.count
 
-    benefit_users_count = len(benefit_users)
-    employees_count = len(employees)
+    benefit_users_count = await session.exec(select(func.count()).select_from(UserRequestStats).
+                                             where(UserRequestStats.requests > 0))
+    benefit_users_count = benefit_users_count.one()
 
     usage_percent = round(benefit_users_count * 100 / employees_count, 2)
 
@@ -104,3 +269,142 @@ async def get_analytics(session: AsyncSession):
         "все_сотрудники": employees_count,
         "соотношение_использования": usage_percent
     }
+
+
+LATENCY_PERCENTILES = (0.5, 0.9, 0.99)
+
+TENURE_BANDS = (
+    ("до 3 месяцев", "3 months"),
+    ("до 1 года", "1 year"),
+    ("до 3 лет", "3 years"),
+)
+
+
+def _in_date_range(statement, column, date_from: datetime.date | None, date_to: datetime.date | None):
+    if date_from is not None:
+        statement = statement.where(column >= datetime.datetime.combine(date_from, datetime.time.min))
+    if date_to is not None:
+        statement = statement.where(
+            column < datetime.datetime.combine(date_to, datetime.time.min) + datetime.timedelta(days=1))
+    return statement
+
+
+async def get_requests_series(period: str, session: AsyncSession, benefit_id: int | None = None,
+                              date_from: datetime.date | None = None, date_to: datetime.date | None = None):
+    bucket = func.date_trunc(period, UserBenefitRelation.created_at).label("period")
+    statement = select(bucket, Benefit.id, Benefit.name,
+                       func.count().label("total"),
+                       func.count().filter(UserBenefitRelation.status == 1).label("waiting"),
+                       func.count().filter(UserBenefitRelation.status == 2).label("approved"),
+                       func.count().filter(UserBenefitRelation.status == 3).label("denied")).join(
+        Benefit, UserBenefitRelation.benefit_id == Benefit.id).group_by(bucket, Benefit.id).order_by(bucket, Benefit.id)
+    if benefit_id is not None:
+        statement = statement.where(UserBenefitRelation.benefit_id == benefit_id)
+    statement = _in_date_range(statement, UserBenefitRelation.created_at, date_from, date_to)
+
+    rows = await session.exec(statement)
+    return [{
+        "period": row.period.date(),
+        "benefit_id": row.id,
+        "name": row.name,
+        "total": row.total,
+        "waiting": row.waiting,
+        "approved": row.approved,
+        "denied": row.denied
+    } for row in rows.all()]
+
+
+async def get_approval_latency(session: AsyncSession, by_benefit: bool = False,
+                               date_from: datetime.date | None = None, date_to: datetime.date | None = None):
+    # hours from submission to the decision, requests decided before the
+    # decision time was recorded are left out
+    latency = func.extract("epoch", UserBenefitRelation.status_changed_at - UserBenefitRelation.created_at) / 3600
+    columns = [func.count().label("decided")]
+    columns += [func.percentile_cont(percentile).within_group(latency).label(f"p{round(percentile * 100)}")
+                for percentile in LATENCY_PERCENTILES]
+    statement = select(*columns).where(UserBenefitRelation.status.in_((2, 3))).where(
+        UserBenefitRelation.status_changed_at.is_not(None))
+    if by_benefit:
+        statement = statement.add_columns(Benefit.id, Benefit.name).join(
+            Benefit, UserBenefitRelation.benefit_id == Benefit.id).group_by(Benefit.id).order_by(Benefit.id)
+    statement = _in_date_range(statement, UserBenefitRelation.status_changed_at, date_from, date_to)
+
+    rows = await session.exec(statement)
+    result = []
+    for row in rows.all():
+        item = row._asdict()
+        for percentile in LATENCY_PERCENTILES:
+            key = f"p{round(percentile * 100)}"
+            item[key] = round(item[key], 2) if item[key] is not None else None
+        if by_benefit:
+            item["benefit_id"] = item.pop("id")
+        result.append(item)
+    return result if by_benefit else result[0]
+
+
+def _tenure_band():
+    bands = [(UserInfoTable.employment_date.is_(None), "не указан")]
+    bands += [(UserInfoTable.employment_date > func.current_date() - literal_column(f"interval '{interval}'"), name)
+              for name, interval in TENURE_BANDS]
+    return case(*bands, else_="больше 3 лет")
+
+
+async def get_usage_by(group: str, session: AsyncSession):
+    group_column = UserInfoTable.place_of_employment if group == "place_of_employment" else _tenure_band()
+    group_column = group_column.label("group")
+    statement = select(group_column,
+                       func.count().label("employees"),
+                       func.count().filter(UserRequestStats.requests > 0).label("benefit_users"),
+                       func.coalesce(func.sum(UserRequestStats.requests), 0).label("requests")).join(
+        User, User.id == UserInfoTable.user_id).outerjoin(
+        UserRequestStats, UserRequestStats.user_id == UserInfoTable.user_id).where(
+        User.active_user == True).group_by(group_column).order_by(group_column)
+
+    rows = await session.exec(statement)
+    return [{
+        group: row.group,
+        "employees": row.employees,
+        "benefit_users": row.benefit_users,
+        "requests": row.requests,
+        "usage_percent": round(row.benefit_users * 100 / row.employees, 2)
+    } for row in rows.all()]
+
+
+async def get_poll_satisfaction(period: str, session: AsyncSession,
+                                date_from: datetime.date | None = None, date_to: datetime.date | None = None,
+                                campaign_id: int | None = None):
+    bucket = func.date_trunc(period, PollResults.create_date).label("period")
+    statement = select(bucket, PollResults.satisfaction_rate, func.count().label("responses")).group_by(
+        bucket, PollResults.satisfaction_rate).order_by(bucket, PollResults.satisfaction_rate)
+    if campaign_id is not None:
+        statement = statement.where(PollResults.poll_id == campaign_id)
+    statement = _in_date_range(statement, PollResults.create_date, date_from, date_to)
+
+    rows = await session.exec(statement)
+    series = {}
+    for row in rows.all():
+        item = series.setdefault(row.period, {
+            "period": row.period.date(),
+            "responses": 0,
+            "average": 0,
+            "distribution": {rate: 0 for rate in range(6)}
+        })
+        item["responses"] += row.responses
+        item["average"] += row.satisfaction_rate * row.responses
+        item["distribution"][row.satisfaction_rate] = row.responses
+    for item in series.values():
+        item["average"] = round(item["average"] / item["responses"], 2)
+    return list(series.values())
+
+
+POLL_EXPORT_HEADER = ["id", "campaign_id", "create_date", "email", "satisfaction_rate", "selected_benefits"]
+
+
+def export_poll_results_statement(date_from: datetime.date | None = None, date_to: datetime.date | None = None,
+                                  campaign_id: int | None = None):
+    statement = select(PollResults.id, PollResults.poll_id, PollResults.create_date, User.email,
+                       PollResults.satisfaction_rate, PollResults.selected_benefits).join(
+        User, User.id == PollResults.user_id).order_by(PollResults.id)
+    if campaign_id is not None:
+        statement = statement.where(PollResults.poll_id == campaign_id)
+    return _in_date_range(statement, PollResults.create_date, date_from, date_to)
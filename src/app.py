@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import FileResponse
 
@@ -6,9 +9,49 @@ from src.auth.router import router as auth_router
 from src.admin.router import router as admin_router
 from src.benefits.router import router as benefits_router
 from src.analitycs.router import router as analytics_router
+from src.analitycs.ingest import poll_buffer
+from src.auth.models import User
+from src.auth.utils import run_auth_token_purge, get_current_admin
+from src.config import STORAGE_GC_INTERVAL, REFERENCE_REFRESH_INTERVAL, AUTH_TOKEN_PURGE_INTERVAL
+from src.database import track_request_sessions, session_stats, get_pool_stats, async_session_maker
+from src.mail.templates import load_email_templates
+from src.mail.utils import mail_queue
+from src.reference import reference, run_reference_refresh
+from src.storage.images import shutdown_image_workers
+from src.storage.utils import run_storage_gc
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_email_templates()
+    mail_queue.start()
+    poll_buffer.start()
+    storage_gc = asyncio.create_task(run_storage_gc(async_session_maker)) if STORAGE_GC_INTERVAL > 0 else None
+    if AUTH_TOKEN_PURGE_INTERVAL > 0:
+        token_purge = asyncio.create_task(run_auth_token_purge(async_session_maker))
+    else:
+        token_purge = None
+    if REFERENCE_REFRESH_INTERVAL > 0:
+        reference_refresh = asyncio.create_task(run_reference_refresh(async_session_maker))
+    else:
+        reference_refresh = None
+        async with async_session_maker() as session:
+            await reference.refresh(session)
+    yield
+    if storage_gc is not None:
+        storage_gc.cancel()
+    if token_purge is not None:
+        token_purge.cancel()
+    if reference_refresh is not None:
+        reference_refresh.cancel()
+    await poll_buffer.stop()
+    await mail_queue.stop()
+    shutdown_image_workers()
+
 
 app = FastAPI(
-    title="UDV Benefits API"
+    title="UDV Benefits API",
+    lifespan=lifespan
 )
 
 origins = [
@@ -29,12 +72,23 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def count_request_sessions(request: Request, call_next):
+    with track_request_sessions():
+        return await call_next(request)
+
+
 @app.get("/ping",
          status_code=200)
 async def ping():
     return {"success": "pong"}
 
 
+@app.get("/metrics")
+async def get_metrics(admin: User = Depends(get_current_admin)):
+    return {"sessions": session_stats, "pool": get_pool_stats()}
+
+
 @app.get("/logo")
 async def get_logo():
     return FileResponse("./static/logo.png")
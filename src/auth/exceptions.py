@@ -12,3 +12,7 @@ class WrongEmail(Exception):
 
 class NotActive(Exception):
     pass
+
+
+class TooManyLinks(Exception):
+    pass
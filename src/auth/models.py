@@ -1,5 +1,6 @@
 import datetime
 import uuid
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 
@@ -8,6 +9,10 @@ class UserBase(SQLModel):
 
 
 class User(UserBase, table=True):
+    __table_args__ = (
+        Index("ix_user_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     email_verified: bool = Field(default=False)
     active_user: bool = Field(default=False)
@@ -21,8 +26,12 @@ class Role(SQLModel, table=True):
 
 class AuthToken(SQLModel, table=True):
     __tablename__ = "auth_token"
+    __table_args__ = (
+        Index("ix_auth_token_user_id_create_date", "user_id", "create_date"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
-    token: str = Field(max_length=40, nullable=False)
+    # sha256 of the token sent in the link
+    token: str = Field(max_length=64, nullable=False, unique=True, index=True)
     user_id: uuid.UUID = Field(foreign_key="user.id")
-    create_date: datetime.datetime | None = Field(default_factory=datetime.datetime.now)
+    create_date: datetime.datetime | None = Field(default_factory=datetime.datetime.now, index=True)
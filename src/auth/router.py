@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 from starlette.responses import JSONResponse
 
-from src.auth.exceptions import WrongEmail, NotVerified, NotActive, InvalidToken
+from src.auth.exceptions import WrongEmail, NotVerified, NotActive, InvalidToken, TooManyLinks
 from src.auth.models import UserBase, User
-from src.auth.utils import verify_user, send_email, generate_auth_link, verify_auth_token, get_current_user, get_profile
-from src.benefit_requests.utils import get_user_requests_by_id
+from src.auth.utils import verify_user, send_email, generate_auth_link, verify_auth_token, get_current_user, \
+    get_profile, check_login_rate
+from src.benefit_requests.utils import get_user_requests_by_id, get_user_requests_summary
 from src.database import get_session
 
 router = APIRouter(tags=["Auth"], prefix="/users")
@@ -22,6 +23,10 @@ async def login(user_data: UserBase,
         user_uuid = await verify_user(email, session)
     except (WrongEmail, NotVerified, NotActive) as error:
         return JSONResponse(content={"detail": error.__str__()}, status_code=status.HTTP_400_BAD_REQUEST)
+    try:
+        await check_login_rate(user_uuid, session)
+    except TooManyLinks as error:
+        return JSONResponse(content={"detail": error.__str__()}, status_code=status.HTTP_429_TOO_MANY_REQUESTS)
     auth_link = await generate_auth_link(user_uuid, session)
     await send_email(email, auth_link, 'login')
 
@@ -48,5 +53,11 @@ async def get_user_profile(session: AsyncSession = Depends(get_session), user_da
 
 @router.get("/requests",
             status_code=status.HTTP_200_OK)
-async def get_user_requests(session: AsyncSession = Depends(get_session), user_data: User = Depends(get_current_user)):
-    return await get_user_requests_by_id(user_data.id, session)
+async def get_user_requests(request_status: int | None = Query(default=None, alias="status"),
+                            limit: int = Query(default=50, ge=1, le=100),
+                            cursor: str | None = None,
+                            summary: bool = False,
+                            session: AsyncSession = Depends(get_session), user_data: User = Depends(get_current_user)):
+    if summary:
+        return await get_user_requests_summary(user_data.id, session)
+    return await get_user_requests_by_id(user_data.id, session, request_status, limit, cursor)
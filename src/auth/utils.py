@@ -1,5 +1,9 @@
+import asyncio
+import datetime
+import hashlib
+import logging
 import secrets
-import smtplib
+import time
 import uuid
 from email.message import EmailMessage
 
@@ -7,18 +11,34 @@ import jwt
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pygments.lexer import default
+from sqlalchemy import and_, delete, func, or_
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 
 from src.admin.models import UserInfoView, UserInfoTable
-from src.auth.exceptions import WrongEmail, NotVerified, NotActive, InvalidToken
+from src.auth.exceptions import WrongEmail, NotVerified, NotActive, InvalidToken, TooManyLinks
 from src.auth.models import User, AuthToken
-from src.config import SECRET_KEY, EMAIL_FROM, EMAIL_PASS, SERVER_HOSTNAME
+from src.cache import TTLCache
+from src.config import SECRET_KEY, EMAIL_FROM, SERVER_HOSTNAME, AUTH_CACHE_TTL, JWT_EMBED_CLAIMS, JWT_CLAIMS_TTL, \
+    AUTH_TOKEN_TTL, INVITE_TOKEN_TTL, LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW, AUTH_TOKEN_PURGE_INTERVAL, \
+    AUTH_TOKEN_PURGE_BATCH
 from src.database import get_session
+from src.mail.models import MailDelivery
+from src.mail.templates import render_email
+from src.mail.utils import mail_queue
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+# The cache and the embedded claims live per worker: deactivating a user clears
+# the entry only on the worker that handles it, the others keep accepting the
+# user for up to AUTH_CACHE_TTL seconds, or JWT_CLAIMS_TTL on the claims path.
+# get_current_admin reads the database, so admin endpoints are never served to
+# a deactivated or demoted user.
+user_cache = TTLCache(AUTH_CACHE_TTL)
+
 
 async def verify_user(email: str, session: AsyncSession):
     user_from_db = await session.exec(select(User).where(User.email == email))
@@ -41,75 +61,163 @@ async def encode_jwt_token(data: dict):
     return jwt_token
 
 
-async def generate_auth_link(user_id: uuid.UUID, session: AsyncSession):
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_auth_token(user_id: uuid.UUID) -> tuple[AuthToken, str]:
+    # only the hash is stored, the token itself exists in the emailed link alone
     token = secrets.token_urlsafe(20)
-    auth_token = AuthToken(token=token, user_id=user_id)
+    auth_token = AuthToken(token=hash_token(token), user_id=user_id)
+    return auth_token, f"{SERVER_HOSTNAME}/users/authorize/{token}"
+
+
+async def generate_auth_link(user_id: uuid.UUID, session: AsyncSession):
+    auth_token, auth_link = create_auth_token(user_id)
     session.add(auth_token)
     await session.commit()
-    return f"{SERVER_HOSTNAME}/users/authorize/{token}"
+    return auth_link
+
+
+async def check_login_rate(user_id: uuid.UUID, session: AsyncSession):
+    window_start = datetime.datetime.now() - datetime.timedelta(seconds=LOGIN_RATE_WINDOW)
+    recent_links = await session.exec(select(func.count()).select_from(AuthToken).
+                                      where(AuthToken.user_id == user_id).
+                                      where(AuthToken.create_date >= window_start))
+    if recent_links.one() >= LOGIN_RATE_LIMIT:
+        raise TooManyLinks("Ссылка для входа уже отправлена, попробуйте позже")
+
+
+def token_expired(create_date: datetime.datetime, email_verified: bool) -> bool:
+    # an unverified user can only hold an invite, login links are refused to them
+    ttl = AUTH_TOKEN_TTL if email_verified else INVITE_TOKEN_TTL
+    return create_date < datetime.datetime.now() - datetime.timedelta(seconds=ttl)
 
 
 async def verify_auth_token(token: str, session: AsyncSession):
-    auth_token = await session.exec(select(AuthToken).where(AuthToken.token == token))
+    # deleting first makes the link single-use even when it is opened twice at once
+    auth_token = await session.exec(delete(AuthToken).where(AuthToken.token == hash_token(token)).
+                                    returning(AuthToken.user_id, AuthToken.create_date))
     auth_token = auth_token.first()
     if auth_token is None:
         raise InvalidToken("Ссылка для входа недействительна")
-    jwt_token = await encode_jwt_token({"sub": auth_token.user_id.__str__()})
-    user = await session.exec(select(User).where(User.id == auth_token.user_id))
+    user_id, create_date = auth_token
+    user = await session.exec(select(User).where(User.id == user_id))
     user = user.first()
+    if token_expired(create_date, user.email_verified):
+        await session.commit()
+        raise InvalidToken("Срок действия ссылки для входа истёк")
     if user.email_verified is False:
         user.email_verified = True
+    claims = {"sub": user_id.__str__()}
+    if JWT_EMBED_CLAIMS:
+        claims.update(email=user.email, role=user.role_id, active=user.active_user, verified=user.email_verified,
+                      claims_exp=int(time.time()) + JWT_CLAIMS_TTL)
+    jwt_token = await encode_jwt_token(claims)
     session.add(user)
-    await session.delete(auth_token)
     await session.commit()
+    invalidate_user_cache(user.id)
 
     return {"success": jwt_token}
 
 
-async def send_email(email_to: str, message: str, msg_type: str = None, invite_from: str = None):
+async def purge_auth_tokens(session: AsyncSession) -> int:
+    now = datetime.datetime.now()
+    login_cutoff = now - datetime.timedelta(seconds=AUTH_TOKEN_TTL)
+    invite_cutoff = now - datetime.timedelta(seconds=INVITE_TOKEN_TTL)
+    # the first bound covers both cases and lets the create_date index narrow the scan
+    expired = (select(AuthToken.id).join(User, User.id == AuthToken.user_id).
+               where(AuthToken.create_date < max(login_cutoff, invite_cutoff)).
+               where(or_(AuthToken.create_date < invite_cutoff,
+                         and_(User.email_verified == True, AuthToken.create_date < login_cutoff))).
+               limit(AUTH_TOKEN_PURGE_BATCH))
+    purged = 0
+    # short batches keep each delete from holding locks on the whole table
+    while True:
+        result = await session.exec(delete(AuthToken).where(AuthToken.id.in_(expired.scalar_subquery())))
+        await session.commit()
+        purged += result.rowcount
+        if result.rowcount < AUTH_TOKEN_PURGE_BATCH:
+            return purged
+
+
+async def run_auth_token_purge(session_maker):
+    while True:
+        await asyncio.sleep(AUTH_TOKEN_PURGE_INTERVAL)
+        try:
+            async with session_maker() as session:
+                await purge_auth_tokens(session)
+        except Exception:
+            logger.exception("Expired auth tokens could not be purged")
+
+
+def build_email(email_to: str, message: str, msg_type: str = None, invite_from: str = None) -> EmailMessage:
     msg = EmailMessage()
     msg['From'] = EMAIL_FROM
     msg['To'] = email_to
     match msg_type:
         case 'login':
             msg['Subject'] = 'Логин в личный кабинет сервиса "Кафетерий бенефитов"'
-            with open('./static/index.html') as html:
-                text = html.read()
-                text = text.replace('url-example', message)
+            text = render_email('login', auth_url=message)
         case 'invite':
             msg['Subject'] = 'Приглашение в "Кафетерий бенефитов"'
-            with open('./static/invite.html') as html:
-                text = html.read()
-                text = text.replace('url-example', message)
-                text = text.replace('ivanivanov@udv.ru', invite_from)
+            text = render_email('invite', auth_url=message, invite_from=invite_from)
         case _:
             msg['Subject'] = 'Mail confirmation'
             text = ''
 
     msg.set_content(text, 'html')
 
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(EMAIL_FROM, EMAIL_PASS)
-        server.send_message(msg)
+    return msg
+
+
+async def send_email(email_to: str, message: str, msg_type: str = None, invite_from: str = None) -> MailDelivery:
+    return mail_queue.put(build_email(email_to, message, msg_type, invite_from))
+
+
+async def send_emails(messages: list[EmailMessage]) -> list[MailDelivery]:
+    return mail_queue.put_many(messages)
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security),
                            session: AsyncSession = Depends(get_session)):
     decoded_token = jwt.decode(credentials.credentials, SECRET_KEY, ["HS256"])
     user_id = decoded_token.get("sub")
-    user = await session.exec(select(User).where(User.id == user_id))
-    user = user.first()
+    user = _user_from_claims(decoded_token) or user_cache.get(user_id)
     if user is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = await session.exec(select(User).where(User.id == user_id))
+        user = user.first()
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user = User(id=user.id, email=user.email, email_verified=user.email_verified,
+                    active_user=user.active_user, role_id=user.role_id)
+        user_cache.set(user_id, user)
     if not user.active_user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is deleted")
     return user
 
 
-async def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(security),
+def _user_from_claims(decoded_token: dict) -> User | None:
+    claims_exp = decoded_token.get("claims_exp")
+    # tokens issued before the verified claim existed go through the cache
+    if claims_exp is None or claims_exp < time.time() or "verified" not in decoded_token:
+        return None
+    return User(id=uuid.UUID(decoded_token["sub"]), email=decoded_token["email"],
+                email_verified=decoded_token["verified"], active_user=decoded_token["active"],
+                role_id=decoded_token["role"])
+
+
+def invalidate_user_cache(user_id: uuid.UUID | str):
+    user_cache.invalidate(str(user_id))
+
+
+async def get_current_admin(user: User = Depends(get_current_user),
                             session: AsyncSession = Depends(get_session)):
-    user = await get_current_user(credentials, session)
-    if user.role_id == 1:
+    admin = await session.exec(select(User.role_id, User.active_user).where(User.id == user.id))
+    admin = admin.first()
+    if admin is None or not admin.active_user:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is deleted")
+    if admin.role_id == 1:
         return user
     else:
         raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED, detail="Access denied")
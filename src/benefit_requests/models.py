@@ -1,6 +1,10 @@
 import datetime
 import uuid
 
+from typing import Literal
+
+from pydantic import BaseModel, Field as PydanticField
+from sqlalchemy import Index, text
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlmodel import SQLModel, Field, Column, String, Relationship
 
@@ -16,6 +20,12 @@ class BenefitStatuses(SQLModel, table=True):
 
 class UserBenefitRelation(SQLModel, table=True):
     __tablename__ = "user_benefit_relation"
+    __table_args__ = (
+        Index("ix_user_benefit_relation_created_at_id", "created_at", "id"),
+        Index("ix_user_benefit_relation_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_user_benefit_relation_benefit_id_created_at_id", "benefit_id", "created_at", "id"),
+        Index("ix_user_benefit_relation_user_id_created_at_id", "user_id", text("created_at DESC"), text("id DESC")),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id")
@@ -24,5 +34,20 @@ class UserBenefitRelation(SQLModel, table=True):
     files: list[str] = Field(sa_column=Column(ARRAY(String), nullable=True), default=None)
     status: int = Field(foreign_key="benefit_statuses.id")
     additional_info: list[str] = Field(sa_column=Column(ARRAY(String), nullable=True), default=None)
+    status_changed_at: datetime.datetime | None = Field(default=None, nullable=True)
 
     benefit: Benefit | None = Relationship(back_populates="requests")
+
+
+class RequestFilters(BaseModel):
+    status: int | None = None
+    benefit_id: int | None = None
+    user_id: uuid.UUID | None = None
+    date_from: datetime.date | None = None
+    date_to: datetime.date | None = None
+
+
+class RequestsStatusChange(BaseModel):
+    action: Literal["apply", "deny"]
+    request_ids: list[int] | None = PydanticField(default=None, max_length=1000)
+    filters: RequestFilters | None = None
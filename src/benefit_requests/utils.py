@@ -1,21 +1,24 @@
-import os
+import base64
+import datetime
 import uuid
-from pathlib import Path
 
 from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, text, tuple_, update, any_, bindparam, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 
 from src.admin.models import UserInfoTable
+from src.analitycs.utils import record_request_created, record_status_change, record_request_stats
 from src.auth.models import User
 from src.benefits.models import Benefit
-from src.benefit_requests.models import UserBenefitRelation, BenefitStatuses
-from src.benefits.utils import get_benefit, files_path
-from src.config import SERVER_URL
-
-project_root = Path(__file__).resolve().parents[2]
-receipts_path = project_root / "files/receipts"
+from src.benefit_requests.models import UserBenefitRelation, BenefitStatuses, RequestFilters, RequestsStatusChange
+from src.benefits.utils import get_benefit
+from src.config import SERVER_URL, REQUESTS_COUNT_LIMIT
+from src.reference import reference
+from src.storage.exceptions import FileTooLarge
+from src.storage.utils import store_upload, RECEIPTS
 
 
 async def validate_benefit_request(benefit_id: int, files: list[UploadFile] | None, session: AsyncSession,
@@ -36,102 +39,277 @@ async def validate_benefit_request(benefit_id: int, files: list[UploadFile] | No
             if not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400,
                                     detail=f"{file.filename} file type not allowed. Only images are accepted.")
-            if file.size > 20000000:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                                    detail=f"File {file.filename} is too large")
-        file_paths = await upload_files(benefit_id, files)
+        file_paths = await upload_files(files, session)
     user_benefit_relation = UserBenefitRelation(user_id=user.id,
                                                 benefit_id=benefit.id,
                                                 files=file_paths,
                                                 status=1)
     session.add(user_benefit_relation)
+    await record_request_created(session, benefit.id, user.id, user_benefit_relation.status)
     await session.commit()
 
     return {"detail": "Benefit request successfully created"}
 
 
-async def upload_files(benefit_id: int, files: list[UploadFile]):
+async def upload_files(files: list[UploadFile], session: AsyncSession):
     file_paths = []
     for image in files:
-        image_id = uuid.uuid4()
-        ext = os.path.splitext(image.filename)[1]
-        image_path = f"{image_id}_{benefit_id}.{ext}"
-        with open(receipts_path / image_path, "wb") as uploaded_file:
-            file_content = await image.read()
-            uploaded_file.write(file_content)
-
-        file_paths.append(image_path)
+        try:
+            file_paths.append(await store_upload(image, RECEIPTS, session))
+        except FileTooLarge as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
     return file_paths
 
 
-async def get_user_requests_by_id(user_id: uuid.UUID, session: AsyncSession):
-    requests = await session.exec(select(UserBenefitRelation, Benefit, BenefitStatuses).where(
-        UserBenefitRelation.user_id == user_id).join(
-        BenefitStatuses, UserBenefitRelation.status == BenefitStatuses.id).join(
-        Benefit, UserBenefitRelation.benefit_id == Benefit.id).order_by(UserBenefitRelation.created_at.desc()))
-    requests = requests.all()
-    if len(requests) == 0:
-        return None
+async def get_user_requests_by_id(user_id: uuid.UUID, session: AsyncSession, request_status: int | None = None,
+                                  limit: int = 50, cursor: str | None = None):
+    statuses = (await reference.load(session)).statuses
+    statement = select(UserBenefitRelation.id, UserBenefitRelation.created_at, Benefit.name,
+                       UserBenefitRelation.status).join(
+        Benefit, UserBenefitRelation.benefit_id == Benefit.id).where(
+        UserBenefitRelation.user_id == user_id).order_by(UserBenefitRelation.created_at.desc(),
+                                                         UserBenefitRelation.id.desc())
+    if request_status is not None:
+        statement = statement.where(UserBenefitRelation.status == request_status)
+    if cursor is not None:
+        statement = statement.where(
+            tuple_(UserBenefitRelation.created_at, UserBenefitRelation.id) < decode_cursor(cursor))
+    statement = statement.limit(limit + 1)
+
+    requests = await session.exec(statement)
+    request_list = [{
+        "request_id": request_id,
+        "name": benefit_name,
+        "creation_date": created_at,
+        "status": f"Заявка {statuses.get(status_id)}"
+    } for request_id, created_at, benefit_name, status_id in requests.all()]
+
+    next_cursor = None
+    if len(request_list) > limit:
+        request_list = request_list[:limit]
+        next_cursor = encode_cursor(request_list[-1]["creation_date"], request_list[-1]["request_id"])
+    return {
+        "requests": request_list,
+        "next_cursor": next_cursor
+    }
+
+
+async def get_user_requests_summary(user_id: uuid.UUID, session: AsyncSession):
+    statuses = (await reference.load(session)).statuses
+    counts = await session.exec(select(UserBenefitRelation.status, func.count()).where(
+        UserBenefitRelation.user_id == user_id).group_by(UserBenefitRelation.status))
+    counts = dict(counts.all())
+    return {
+        "statuses": {name: counts.get(status_id, 0) for status_id, name in statuses.items()},
+        "total": sum(counts.values())
+    }
+
+
+def apply_request_filters(statement, filters: RequestFilters):
+    if filters.status is not None:
+        statement = statement.where(UserBenefitRelation.status == filters.status)
+    if filters.benefit_id is not None:
+        statement = statement.where(UserBenefitRelation.benefit_id == filters.benefit_id)
+    if filters.user_id is not None:
+        statement = statement.where(UserBenefitRelation.user_id == filters.user_id)
+    if filters.date_from is not None:
+        statement = statement.where(
+            UserBenefitRelation.created_at >= datetime.datetime.combine(filters.date_from, datetime.time.min))
+    if filters.date_to is not None:
+        statement = statement.where(
+            UserBenefitRelation.created_at < datetime.datetime.combine(filters.date_to, datetime.time.min) +
+            datetime.timedelta(days=1))
+    return statement
+
+
+def encode_cursor(created_at: datetime.datetime, request_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{request_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    try:
+        created_at, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(request_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def count_requests(filters: RequestFilters, session: AsyncSession) -> tuple[int, bool]:
+    """Exact count up to REQUESTS_COUNT_LIMIT, past it a planner estimate or the limit itself."""
+    capped = apply_request_filters(select(UserBenefitRelation.id), filters).limit(REQUESTS_COUNT_LIMIT).subquery()
+    total = await session.exec(select(func.count()).select_from(capped))
+    total = total.one()
+    if total < REQUESTS_COUNT_LIMIT:
+        return total, False
+    if filters.model_dump(exclude_none=True):
+        return total, True
+    estimate = await session.exec(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'user_benefit_relation'::regclass"))
+    return max(estimate.scalar_one(), total), True
+
+
+async def get_all_requests(sort_by_date_desc: bool, session: AsyncSession, filters: RequestFilters = None,
+                           limit: int = 50, cursor: str | None = None, with_total: bool = False):
+    """One page of requests, the total is counted for the first page or when with_total is set."""
+    filters = filters or RequestFilters()
+    if sort_by_date_desc:
+        order_by = (UserBenefitRelation.created_at.desc(), UserBenefitRelation.id.desc())
     else:
-        request_list = []
-        for request in requests:
-            relation, benefit, benefit_status = request
-            request_list.append({
-                "request_id": relation.id,
-                "name": benefit.name,
-                "creation_date": relation.created_at,
-                "status": f"Заявка {benefit_status.name}"
-            })
-    return request_list
-
-
-async def get_all_requests(sort_by_date_desc: bool, session: AsyncSession):
-    sort_column = UserBenefitRelation.created_at.desc() if sort_by_date_desc else UserBenefitRelation.created_at
-    requests = await session.exec(
-        select(UserBenefitRelation, Benefit, BenefitStatuses,
-               UserInfoTable).join(BenefitStatuses,
-                                   UserBenefitRelation.status == BenefitStatuses.id).join(
+        order_by = (UserBenefitRelation.created_at, UserBenefitRelation.id)
+    statuses = (await reference.load(session)).statuses
+    statement = apply_request_filters(
+        select(UserBenefitRelation.id, UserBenefitRelation.created_at, Benefit.name, UserInfoTable.full_name,
+               UserBenefitRelation.status).join(
             Benefit, UserBenefitRelation.benefit_id == Benefit.id).join(
-            UserInfoTable, UserInfoTable.user_id == UserBenefitRelation.user_id).order_by(
-            sort_column))
+            UserInfoTable, UserInfoTable.user_id == UserBenefitRelation.user_id), filters).order_by(*order_by)
+
+    if cursor is not None:
+        key = tuple_(UserBenefitRelation.created_at, UserBenefitRelation.id)
+        statement = statement.where(key < decode_cursor(cursor) if sort_by_date_desc else key > decode_cursor(cursor))
+    statement = statement.limit(limit + 1)
+
+    requests = await session.exec(statement)
     requests = requests.all()
-    if len(requests) == 0:
-        return None
+    request_list = [{
+        "request_id": request_id,
+        "name": benefit_name,
+        "user_name": user_name,
+        "creation_date": created_at,
+        "status": f"Заявка {statuses.get(status_id)}"
+    } for request_id, created_at, benefit_name, user_name, status_id in requests]
+
+    next_cursor = None
+    if len(request_list) > limit:
+        request_list = request_list[:limit]
+        next_cursor = encode_cursor(request_list[-1]["creation_date"], request_list[-1]["request_id"])
+    total, total_is_estimate = None, None
+    if cursor is None or with_total:
+        total, total_is_estimate = await count_requests(filters, session)
+    return {
+        "requests": request_list,
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_is_estimate": total_is_estimate
+    }
+
+
+REQUEST_EXPORT_HEADER = ["request_id", "created_at", "benefit", "user_name", "email", "status",
+                         "status_changed_at", "additional_info", "files"]
+
+
+def export_requests_statement(sort_by_date_desc: bool, filters: RequestFilters):
+    if sort_by_date_desc:
+        order_by = (UserBenefitRelation.created_at.desc(), UserBenefitRelation.id.desc())
     else:
-        request_list = []
-        for request in requests:
-            relation, benefit, benefit_status, user_info = request
-            request_list.append({
-                "request_id": relation.id,
-                "name": benefit.name,
-                "user_name": user_info.full_name,
-                "creation_date": relation.created_at,
-                "status": f"Заявка {benefit_status.name}"
-            })
-    return request_list
+        order_by = (UserBenefitRelation.created_at, UserBenefitRelation.id)
+    return apply_request_filters(
+        select(UserBenefitRelation.id, UserBenefitRelation.created_at, Benefit.name, UserInfoTable.full_name,
+               User.email, BenefitStatuses.name, UserBenefitRelation.status_changed_at,
+               UserBenefitRelation.additional_info, UserBenefitRelation.files).join(
+            BenefitStatuses, UserBenefitRelation.status == BenefitStatuses.id).join(
+            Benefit, UserBenefitRelation.benefit_id == Benefit.id).join(
+            User, User.id == UserBenefitRelation.user_id).outerjoin(
+            UserInfoTable, UserInfoTable.user_id == UserBenefitRelation.user_id), filters).order_by(*order_by)
 
 
 async def change_request_status(request_id: int, request_status: int, session: AsyncSession):
-    statuses = await session.exec(select(BenefitStatuses))
-    statuses = statuses.all()
-    request = await session.exec(select(UserBenefitRelation).where(UserBenefitRelation.id == request_id))
+    status_name = await reference.status_name(request_status, session)
+    request = await session.exec(select(UserBenefitRelation).where(UserBenefitRelation.id == request_id).
+                                 with_for_update())
     request = request.first()
     if request is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Request with id {request_id} is not found")
     else:
+        await record_status_change(session, request.benefit_id, request.status, request_status)
         request.status = request_status
+        request.status_changed_at = datetime.datetime.now()
         session.add(request)
         await session.commit()
-        return {"detail": f"Заявка {statuses[request_status - 1].name}"}
+        return {"detail": f"Заявка {status_name}"}
+
+
+REQUEST_ACTIONS = {"apply": 2, "deny": 3}
+# only requests still in review can be approved or denied in bulk
+BULK_FROM_STATUS = 1
+
+
+async def change_requests_status(change: RequestsStatusChange, session: AsyncSession):
+    if (change.request_ids is None) == (change.filters is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Either request_ids or filters must be given")
+    # empty filters would approve or deny every pending request
+    if change.filters is not None and not change.filters.model_dump(exclude_none=True):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="At least one filter must be given")
+    new_status = REQUEST_ACTIONS[change.action]
+    statement = update(UserBenefitRelation).where(UserBenefitRelation.status == BULK_FROM_STATUS).values(
+        status=new_status, status_changed_at=datetime.datetime.now()).returning(
+        UserBenefitRelation.id, UserBenefitRelation.benefit_id).execution_options(synchronize_session=False)
+    request_ids = None
+    if change.request_ids is not None:
+        request_ids = list(dict.fromkeys(change.request_ids))
+        statement = statement.where(
+            UserBenefitRelation.id == any_(bindparam("request_ids", request_ids, type_=ARRAY(Integer))))
+    else:
+        statement = apply_request_filters(statement, change.filters)
+
+    updated = await session.exec(statement)
+    updated = updated.all()
+    await record_request_stats(session, bulk_status_deltas(updated, new_status))
+    await session.commit()
+
+    updated_ids = [request_id for request_id, _ in updated]
+    current = {}
+    if request_ids is not None:
+        skipped = list(set(request_ids) - set(updated_ids))
+        if skipped:
+            current = await session.exec(select(UserBenefitRelation.id, UserBenefitRelation.status).where(
+                UserBenefitRelation.id == any_(bindparam("request_ids", skipped, type_=ARRAY(Integer)))))
+            current = dict(current.all())
+
+    return {
+        "updated": len(updated),
+        "results": bulk_outcomes(change.action, request_ids, updated_ids, current)
+    }
+
+
+def bulk_status_deltas(updated: list[tuple[int, int]], new_status: int) -> dict[tuple[int, int], int]:
+    """Counter deltas for (request id, benefit id) pairs moved from BULK_FROM_STATUS to new_status."""
+    status_deltas = {}
+    for request_id, benefit_id in updated:
+        status_deltas[(benefit_id, BULK_FROM_STATUS)] = status_deltas.get((benefit_id, BULK_FROM_STATUS), 0) - 1
+        status_deltas[(benefit_id, new_status)] = status_deltas.get((benefit_id, new_status), 0) + 1
+    return status_deltas
+
+
+def bulk_outcomes(action: str, request_ids: list[int] | None, updated_ids: list[int],
+                  current: dict[int, int]) -> list[dict]:
+    """Per request outcome, in the order of request_ids when they were given.
+
+    current maps the ids that were not updated to their status, ids missing
+    from it do not exist.
+    """
+    outcome = "applied" if action == "apply" else "denied"
+    results = {request_id: {"request_id": request_id, "outcome": outcome} for request_id in updated_ids}
+    if request_ids is None:
+        return list(results.values())
+    for request_id in request_ids:
+        if request_id in results:
+            continue
+        if request_id in current:
+            results[request_id] = {"request_id": request_id, "outcome": "invalid_transition",
+                                   "status": current[request_id]}
+        else:
+            results[request_id] = {"request_id": request_id, "outcome": "not_found"}
+    return [results[request_id] for request_id in request_ids]
 
 
 async def get_request_info_by_id(request_id: int, session: AsyncSession):
+    statuses = (await reference.load(session)).statuses
     request = await session.exec(
-        select(UserBenefitRelation, Benefit, BenefitStatuses,
-               UserInfoTable).join(BenefitStatuses,
-                                   UserBenefitRelation.status == BenefitStatuses.id).join(
+        select(UserBenefitRelation, Benefit, UserInfoTable).join(
             Benefit, UserBenefitRelation.benefit_id == Benefit.id).join(
             UserInfoTable, UserInfoTable.user_id == UserBenefitRelation.user_id).where(
             UserBenefitRelation.id == request_id))
@@ -140,7 +318,7 @@ async def get_request_info_by_id(request_id: int, session: AsyncSession):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail=f"Request with id {request_id} is not found")
     else:
-        relation, benefit, benefit_status, user_info = request
+        relation, benefit, user_info = request
         files = []
         if relation.files is not None:
             for path in relation.files:
@@ -150,7 +328,7 @@ async def get_request_info_by_id(request_id: int, session: AsyncSession):
             "name": benefit.name,
             "user_name": user_info.full_name,
             "creation_date": relation.created_at,
-            "status": f"Заявка {benefit_status.name}",
+            "status": f"Заявка {statuses.get(relation.status)}",
             "attached_files": files
         }
     return request_info
@@ -168,16 +346,14 @@ async def validate_insurance_request(benefit_id: int, insurance_member: str, ins
             if not file.content_type.startswith('image/'):
                 raise HTTPException(status_code=400,
                                     detail=f"{file.filename} file type not allowed. Only images are accepted.")
-            if file.size > 20000000:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                                    detail=f"File {file.filename} is too large")
-        file_paths = await upload_files(benefit_id, files)
+        file_paths = await upload_files(files, session)
     user_benefit_relation = UserBenefitRelation(user_id=user.id,
                                                 benefit_id=benefit.id,
                                                 files=file_paths,
                                                 status=1,
                                                 additional_info=[insurance_member, insurance_type])
     session.add(user_benefit_relation)
+    await record_request_created(session, benefit.id, user.id, user_benefit_relation.status)
     await session.commit()
 
     return {"detail": "Benefit request successfully created"}
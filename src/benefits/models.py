@@ -1,6 +1,6 @@
 from sqlalchemy.dialects.postgresql import ARRAY
-from sqlmodel import SQLModel, Field, Column, Integer, Relationship
-from sqlalchemy import Interval
+from sqlmodel import SQLModel, Field, Column, Integer, String, Relationship
+from sqlalchemy import Interval, Index
 
 from src.config import SERVER_URL
 
@@ -15,8 +15,11 @@ class BenefitBase(SQLModel):
 
 
 class Benefit(BenefitBase, table=True):
+    __table_args__ = (Index("ix_benefit_categories", "categories", postgresql_using="gin"),)
+
     id: int | None = Field(default=None, primary_key=True)
     cover_path: str = Field(max_length=150, nullable=True)
+    cover_variants: list[str] | None = Field(sa_column=Column(ARRAY(String), nullable=True), default=None)
 
     requests: list["UserBenefitRelation"] = Relationship(back_populates='benefit', cascade_delete=True)
 
@@ -32,9 +35,20 @@ class BenefitShort:
     name: str
     card_name: str
     cover_url: str
+    cover_variants: dict[str, dict[str, str]]
 
-    def __init__(self, benefit_id, name, card_name, cover_path):
+    def __init__(self, benefit_id, name, card_name, cover_path, cover_variants=None):
         self.id = benefit_id
         self.name = name
         self.card_name = card_name
         self.cover_url = f"{SERVER_URL}/benefits/images/{cover_path}" if cover_path is not None else None
+        self.cover_variants = self._variant_urls(cover_variants or [])
+
+    @staticmethod
+    def _variant_urls(variants):
+        # variant names look like <hash>-<width>.<format>
+        urls = {}
+        for variant in variants:
+            size, fmt = variant.rsplit("-", 1)[1].split(".", 1)
+            urls.setdefault(size, {})[fmt] = f"{SERVER_URL}/benefits/images/{variant}"
+        return urls
@@ -1,8 +1,5 @@
-from pathlib import Path
-
-from fastapi import APIRouter, Depends, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, HTTPException, Request
 from sqlmodel.ext.asyncio.session import AsyncSession
-from starlette.responses import FileResponse
 
 from src.auth.models import User
 from src.auth.utils import get_current_user, get_current_admin
@@ -11,13 +8,13 @@ from src.benefits.models import BenefitBase
 from src.benefits.utils import add_benefit, get_benefits, get_benefit, delete_benefit, update_benefit, update_cover, \
     get_categories
 from src.database import get_session
+from src.storage.backends import get_storage
+from src.storage.responses import IMMUTABLE
+from src.storage.utils import COVERS
 
 router = APIRouter(prefix="/benefits",
                    tags=["Benefits"])
 
-project_root = Path(__file__).resolve().parents[2]
-files_path = project_root / "files/benefit_covers"
-
 
 @router.get("/all")
 async def get_all_benefits(session: AsyncSession = Depends(get_session),
@@ -50,10 +47,11 @@ async def get_benefit_info_by_id(benefit_id: int,
 
 
 @router.post("/{benefit_id}/cover")
-async def update_benefit_cover(benefit_id: int, image: UploadFile | None,
+async def update_benefit_cover(benefit_id: int, image: UploadFile | None = None,
                                session: AsyncSession = Depends(get_session),
                                admin: User = Depends(get_current_admin)):
-    if not image.content_type.startswith('image/'):
+    # without an image the cover is removed
+    if image is not None and not (image.content_type or "").startswith('image/'):
         raise HTTPException(status_code=400, detail="File type not allowed. Only images are accepted.")
     url = await update_cover(benefit_id, image, session)
     return {"success": url}
@@ -77,9 +75,8 @@ async def delete_benefit_by_id(benefit_id: int,
 
 
 @router.get("/images/{path}")
-async def get_benefit_cover(path: str):
-    img_path = Path(files_path / path)
-    return FileResponse(img_path)
+async def get_benefit_cover(path: str, request: Request):
+    return await get_storage(COVERS).response(path, request, IMMUTABLE)
 
 
 @router.post("/apply/{benefit_id}")
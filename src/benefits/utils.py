@@ -1,36 +1,68 @@
-import os
 import uuid
-from datetime import datetime
-from pathlib import Path
 
 from fastapi import HTTPException, UploadFile
+from sqlalchemy import func, or_
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from starlette import status
 
 from src.admin.models import UserInfoTable
+from src.analitycs.utils import record_request_stats, invalidate_benefit_ids
 from src.auth.models import User
+from src.benefit_requests.models import UserBenefitRelation
 from src.benefits.models import Benefit, BenefitBase, BenefitShort, Category
-from src.config import SERVER_URL
+from src.cache import TTLCache
+from src.config import SERVER_URL, CATALOG_CACHE_TTL
+from src.reference import reference
+from src.storage.exceptions import FileTooLarge, InvalidImage
+from src.storage.utils import store_image_upload, release_file, COVERS
+
+catalog_cache = TTLCache(CATALOG_CACHE_TTL)
+
+
+def eligible_categories_statement(user_id: uuid.UUID):
+    # a category opens once the employee has worked longer than the availability
+    # interval of the category before it, the first category is open right away
+    thresholds = select(Category.id, func.lag(Category.availability_interval).over(
+        order_by=Category.id).label("threshold")).subquery()
+    employment_date = select(UserInfoTable.employment_date).where(
+        UserInfoTable.user_id == user_id).scalar_subquery()
+    return select(thresholds.c.id).where(
+        or_(thresholds.c.threshold.is_(None),
+            employment_date + thresholds.c.threshold < func.current_date())).order_by(thresholds.c.id)
+
+
+async def get_catalog_tier(categories: tuple[int, ...] | None, session: AsyncSession) -> list[BenefitShort]:
+    benefits = catalog_cache.get(categories)
+    if benefits is None:
+        statement = select(Benefit).order_by(Benefit.id)
+        if categories is not None:
+            statement = statement.where(Benefit.categories.overlap(list(categories)))
+        benefits = await session.exec(statement)
+        benefits = [BenefitShort(benefit.id, benefit.name, benefit.card_name, benefit.cover_path,
+                                 benefit.cover_variants) for benefit in benefits.all()]
+        catalog_cache.set(categories, benefits)
+    return benefits
+
 
-project_root = Path(__file__).resolve().parents[2]
-files_path = project_root / "files/benefit_covers"
+def invalidate_catalog():
+    catalog_cache.invalidate()
+    invalidate_benefit_ids()
 
 
 async def add_benefit(benefit_data: BenefitBase, session: AsyncSession):
     benefit = Benefit(**benefit_data.model_dump())
     session.add(benefit)
     await session.commit()
+    invalidate_catalog()
     return benefit
 
 
 async def get_benefits(user_data: User, session: AsyncSession):
-    benefits = await session.exec(select(Benefit))
-    benefits = benefits.all()
-    benefits = await filter_benefits(user_data, benefits, session)
-    benefits = [BenefitShort(benefit.id, benefit.name, benefit.card_name, benefit.cover_path) for benefit in benefits]
-
-    return benefits
+    if user_data.role_id == 1:
+        return await get_catalog_tier(None, session)
+    categories = await session.exec(eligible_categories_statement(user_data.id))
+    return await get_catalog_tier(tuple(categories.all()), session)
 
 
 async def get_benefit(benefit_id: int, session: AsyncSession):
@@ -44,31 +76,35 @@ async def get_benefit(benefit_id: int, session: AsyncSession):
 async def delete_benefit(benefit_id: int, session: AsyncSession):
     benefit = await get_benefit(benefit_id, session)
     await update_cover(benefit.id, None, session)
+    # requests cascade with the benefit, their authors stop counting as users of it
+    user_requests = await session.exec(select(UserBenefitRelation.user_id, func.count()).
+                                       where(UserBenefitRelation.benefit_id == benefit.id).
+                                       group_by(UserBenefitRelation.user_id))
+    await record_request_stats(session, {}, {user_id: -count for user_id, count in user_requests.all()})
     await session.delete(benefit)
     await session.commit()
+    invalidate_catalog()
 
 
 async def update_cover(benefit_id: int, image: UploadFile | None, session: AsyncSession):
     benefit = await get_benefit(benefit_id, session)
-    try:
-        if benefit.cover_path is not None:
-            os.remove(files_path / benefit.cover_path)
-    except FileNotFoundError as e:
-        print(e)
-
+    image_path, variants = None, None
     if image is not None:
-        image_id = uuid.uuid4()
-        ext = os.path.splitext(image.filename)[1]
-        image_path = f"{image_id}.{ext}"
-        with open(files_path / image_path, "wb") as uploaded_file:
-            file_content = await image.read()
-            uploaded_file.write(file_content)
+        try:
+            image_path, variants = await store_image_upload(image, COVERS, session)
+        except (FileTooLarge, InvalidImage) as error:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(error))
 
-        benefit.cover_path = image_path
+    if benefit.cover_path is not None:
+        await release_file(benefit.cover_path, COVERS, session)
 
-        session.add(benefit)
-        await session.commit()
+    benefit.cover_path = image_path
+    benefit.cover_variants = variants
+    session.add(benefit)
+    await session.commit()
+    invalidate_catalog()
 
+    if image_path is not None:
         return f"{SERVER_URL}/benefits/images/{image_path}"
 
 
@@ -79,38 +115,9 @@ async def update_benefit(benefit_id: int, benefit_data: BenefitBase, session: As
         setattr(benefit, key, value)
     session.add(benefit)
     await session.commit()
-    return BenefitShort(benefit_id, benefit.name, benefit.card_name, benefit.cover_path)
+    invalidate_catalog()
+    return BenefitShort(benefit_id, benefit.name, benefit.card_name, benefit.cover_path, benefit.cover_variants)
 
 
 async def get_categories(session: AsyncSession):
-    categories = await session.exec(select(Category))
-    categories = categories.all()
-    print(categories)
-    return categories
-
-
-async def filter_benefits(user, benefits, session):
-    if user.role_id == 1:
-        return benefits
-    else:
-        filtered_benefits = []
-        categories = await get_categories(session)
-        user_instance = await session.exec(select(User, UserInfoTable).join(UserInfoTable).
-                                           where(User.active_user == True).
-                                           where(User.id == user.id))
-        user_instance = user_instance.first()
-        worker_exp_days = (datetime.now().date() - user_instance[1].employment_date).days
-        for benefit in benefits:
-            for category in benefit.categories:
-                if category == 1:
-                    filtered_benefits.append(benefit)
-                    break
-                elif category in [2, 3]:
-                    if categories[category - 2].availability_interval.days < worker_exp_days:
-                        filtered_benefits.append(benefit)
-                        break
-                elif category == 4:
-                    if categories[3].availability_interval.days < worker_exp_days:
-                        filtered_benefits.append(benefit)
-
-        return filtered_benefits
+    return list((await reference.load(session)).categories.values())
@@ -16,3 +16,66 @@ EMAIL_PASS = os.environ.get("EMAIL_PASSWORD")
 
 SERVER_HOSTNAME = os.environ.get("SERVER_HOSTNAME")
 SERVER_URL = os.environ.get("SERVER_URL")
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 465))
+SMTP_USE_SSL = os.environ.get("SMTP_USE_SSL", "true").lower() == "true"
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "true").lower() == "true"
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+
+MAIL_WORKERS = int(os.environ.get("MAIL_WORKERS", 2))
+MAIL_MAX_RETRIES = int(os.environ.get("MAIL_MAX_RETRIES", 3))
+MAIL_RETRY_DELAY = float(os.environ.get("MAIL_RETRY_DELAY", 1))
+
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", 5))
+JWT_EMBED_CLAIMS = os.environ.get("JWT_EMBED_CLAIMS", "false").lower() == "true"
+JWT_CLAIMS_TTL = int(os.environ.get("JWT_CLAIMS_TTL", 300))
+AUTH_TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", 900))
+INVITE_TOKEN_TTL = int(os.environ.get("INVITE_TOKEN_TTL", 7 * 24 * 3600))
+AUTH_TOKEN_PURGE_INTERVAL = int(os.environ.get("AUTH_TOKEN_PURGE_INTERVAL", 3600))
+AUTH_TOKEN_PURGE_BATCH = int(os.environ.get("AUTH_TOKEN_PURGE_BATCH", 1000))
+LOGIN_RATE_LIMIT = int(os.environ.get("LOGIN_RATE_LIMIT", 3))
+LOGIN_RATE_WINDOW = int(os.environ.get("LOGIN_RATE_WINDOW", 600))
+
+DB_PORT = int(os.environ.get("DB_PORT", 5432))
+DB_ECHO = os.environ.get("DB_ECHO", "false").lower() == "true"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", 0))
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+
+CATALOG_CACHE_TTL = float(os.environ.get("CATALOG_CACHE_TTL", 300))
+POLL_CACHE_TTL = float(os.environ.get("POLL_CACHE_TTL", 10))
+REFERENCE_REFRESH_INTERVAL = float(os.environ.get("REFERENCE_REFRESH_INTERVAL", 300))
+POLL_SUMMARY_CACHE_TTL = float(os.environ.get("POLL_SUMMARY_CACHE_TTL", 60))
+POLL_BATCH_SIZE = int(os.environ.get("POLL_BATCH_SIZE", 500))
+POLL_FLUSH_INTERVAL = float(os.environ.get("POLL_FLUSH_INTERVAL", 50))
+
+UPLOAD_MAX_SIZE = int(os.environ.get("UPLOAD_MAX_SIZE", 20000000))
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local")
+STORAGE_ROOT = os.environ.get("STORAGE_ROOT")
+STORAGE_GC_INTERVAL = int(os.environ.get("STORAGE_GC_INTERVAL", 3600))
+STORAGE_GC_GRACE = int(os.environ.get("STORAGE_GC_GRACE", 3600))
+
+S3_BUCKET = os.environ.get("S3_BUCKET")
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+S3_ACCESS_KEY = os.environ.get("S3_ACCESS_KEY")
+S3_SECRET_KEY = os.environ.get("S3_SECRET_KEY")
+S3_REGION = os.environ.get("S3_REGION")
+
+STORAGE_SENDFILE = os.environ.get("STORAGE_SENDFILE", "")
+STORAGE_ACCEL_PREFIX = os.environ.get("STORAGE_ACCEL_PREFIX", "/internal-files")
+
+COVER_VARIANT_WIDTHS = [int(width) for width in os.environ.get("COVER_VARIANT_WIDTHS", "320,640,1280").split(",")
+                        if width]
+COVER_VARIANT_FORMATS = [fmt for fmt in os.environ.get("COVER_VARIANT_FORMATS", "webp,avif").split(",") if fmt]
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+
+REQUESTS_COUNT_LIMIT = int(os.environ.get("REQUESTS_COUNT_LIMIT", 10000))
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 1000))
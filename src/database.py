@@ -1,16 +1,151 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel import Session
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlalchemy.ext.asyncio import async_sessionmaker
-from src.config import DB_USER, DB_PASS, DB_HOST, DB_NAME
+from src.config import DB_USER, DB_PASS, DB_HOST, DB_NAME, DB_PORT, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, \
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT, DB_STATEMENT_CACHE_SIZE
+
+DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+pool_stats = {
+    "checkouts": 0,
+    "checkins": 0,
+    "connects": 0,
+    "closes": 0,
+    "invalidations": 0,
+    "wait_timeouts": 0,
+    "wait_time_total": 0.0,
+    "wait_time_max": 0.0,
+}
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_stats["wait_timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            pool_stats["wait_time_total"] += waited
+            pool_stats["wait_time_max"] = max(pool_stats["wait_time_max"], waited)
+
+
+connect_args = {}
+if DB_STATEMENT_TIMEOUT > 0:
+    connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}
+
+# the dialect prepares every statement through its own cache, sized here
+engine = create_async_engine(
+    f"{DATABASE_URL}?prepared_statement_cache_size={DB_STATEMENT_CACHE_SIZE}",
+    echo=DB_ECHO,
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args=connect_args,
+)
+
+
+def _count(name):
+    def listener(*args):
+        pool_stats[name] += 1
+    return listener
+
+
+event.listen(engine.sync_engine, "checkout", _count("checkouts"))
+event.listen(engine.sync_engine, "checkin", _count("checkins"))
+event.listen(engine.sync_engine, "connect", _count("connects"))
+event.listen(engine.sync_engine, "close", _count("closes"))
+event.listen(engine.sync_engine, "invalidate", _count("invalidations"))
+
+
+def get_pool_stats():
+    pool = engine.sync_engine.pool
+    return {
+        "pid": os.getpid(),
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        **pool_stats,
+    }
+
+
+async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class RequestSession(Session):
+    """Session that checks a connection out on first use and keeps it until close.
+
+    Commits inside one request do not return the connection to the pool and
+    check it out again, while requests that never touch the database (auth
+    answered from the cache or the JWT claims) do not check one out at all.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._request_connection = None
+
+    def get_bind(self, *args, **kwargs):
+        if self._request_connection is None:
+            self._request_connection = super().get_bind(*args, **kwargs).connect()
+        return self._request_connection
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            if self._request_connection is not None:
+                self._request_connection.close()
+                self._request_connection = None
+
+
+request_session_maker = async_sessionmaker(engine, class_=AsyncSession, sync_session_class=RequestSession,
+                                           expire_on_commit=False)
+
+session_stats = {
+    "requests": 0,
+    "sessions_opened": 0,
+    "requests_with_session": 0,
+    "max_sessions_per_request": 0,
+}
+
+_request_sessions: ContextVar[list[int] | None] = ContextVar("request_sessions", default=None)
 
-DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}"
 
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+@contextmanager
+def track_request_sessions():
+    counter = [0]
+    token = _request_sessions.set(counter)
+    try:
+        yield counter
+    finally:
+        _request_sessions.reset(token)
+        session_stats["requests"] += 1
+        if counter[0] > 0:
+            session_stats["requests_with_session"] += 1
+        session_stats["max_sessions_per_request"] = max(session_stats["max_sessions_per_request"], counter[0])
 
 
 async def get_session() -> AsyncSession:
-    async_session = async_sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
-    async with async_session() as session:
+    counter = _request_sessions.get()
+    if counter is not None:
+        counter[0] += 1
+    session_stats["sessions_opened"] += 1
+    async with request_session_maker() as session:
         yield session
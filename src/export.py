@@ -0,0 +1,97 @@
+import asyncio
+import csv
+import datetime
+import io
+import os
+import tempfile
+import uuid
+from typing import Literal
+
+from fastapi import HTTPException
+from starlette import status
+from starlette.responses import StreamingResponse
+
+from src.config import EXPORT_CHUNK_ROWS, UPLOAD_CHUNK_SIZE
+from src.database import async_session_maker
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+ExportFormat = Literal["csv", "xlsx"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def _cell(value):
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+async def _stream_rows(statement):
+    # the export outlives the request session, so it reads through its own
+    # server-side cursor and keeps only one partition of rows in memory
+    async with async_session_maker() as session:
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield [[_cell(value) for value in row] for row in rows]
+
+
+async def _csv_chunks(statement, header: list[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # the BOM makes Excel open cyrillic text as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    async for rows in _stream_rows(statement):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _xlsx_chunks(statement, header: list[str]):
+    # xlsx is a zip archive, it is written to a temp file in constant memory
+    # mode and streamed once the archive is complete
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True,
+                                              "default_date_format": "yyyy-mm-dd hh:mm:ss",
+                                              "remove_timezone": True})
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, header)
+        row_number = 1
+        async for rows in _stream_rows(statement):
+            for row in rows:
+                worksheet.write_row(row_number, 0, row)
+                row_number += 1
+        await asyncio.to_thread(workbook.close)
+
+        with open(path, "rb") as file:
+            while chunk := await asyncio.to_thread(file.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def export_response(statement, header: list[str], export_format: ExportFormat, name: str) -> StreamingResponse:
+    if export_format == "xlsx":
+        if xlsxwriter is None:
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED,
+                                detail="XlsxWriter is required for xlsx export")
+        chunks = _xlsx_chunks(statement, header)
+    else:
+        chunks = _csv_chunks(statement, header)
+    filename = f"{name}-{datetime.date.today().isoformat()}.{export_format}"
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[export_format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -0,0 +1,23 @@
+import datetime
+import enum
+import uuid
+
+from pydantic import BaseModel, Field
+
+
+class DeliveryStatus(str, enum.Enum):
+    queued = "queued"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+
+class MailDelivery(BaseModel):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+    email_to: str
+    subject: str | None = None
+    status: DeliveryStatus = DeliveryStatus.queued
+    attempts: int = 0
+    last_error: str | None = None
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    sent_at: datetime.datetime | None = None
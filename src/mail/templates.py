@@ -0,0 +1,41 @@
+import os
+from pathlib import Path
+from string import Template
+
+project_root = Path(__file__).resolve().parents[2]
+templates_path = project_root / "static"
+
+
+class EmailTemplate:
+    """HTML email body compiled once and reloaded only when the file changes on disk."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._template: Template | None = None
+        self._mtime: int | None = None
+
+    def load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime:
+            with open(self.path, encoding="utf-8") as html:
+                self._template = Template(html.read())
+            self._mtime = mtime
+        return self._template
+
+    def render(self, **values) -> str:
+        return self.load().substitute(values)
+
+
+email_templates = {
+    'login': EmailTemplate(templates_path / "index.html"),
+    'invite': EmailTemplate(templates_path / "invite.html"),
+}
+
+
+def load_email_templates():
+    for template in email_templates.values():
+        template.load()
+
+
+def render_email(msg_type: str, **values) -> str:
+    return email_templates[msg_type].render(**values)
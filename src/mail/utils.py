@@ -0,0 +1,124 @@
+import asyncio
+import datetime
+import logging
+import smtplib
+import ssl
+from email.message import EmailMessage
+
+from src.config import SMTP_HOST, SMTP_PORT, SMTP_USE_SSL, SMTP_STARTTLS, SMTP_TIMEOUT, EMAIL_FROM, EMAIL_PASS, \
+    MAIL_WORKERS, MAIL_MAX_RETRIES, MAIL_RETRY_DELAY
+from src.mail.models import MailDelivery, DeliveryStatus
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPConnection:
+    """Long-lived authenticated SMTP connection, used from a worker thread."""
+
+    def __init__(self):
+        self._server: smtplib.SMTP | None = None
+
+    def _connect(self):
+        if SMTP_USE_SSL:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+            # the password must not cross the network in clear text
+            if SMTP_STARTTLS:
+                server.starttls(context=ssl.create_default_context())
+        if EMAIL_PASS:
+            server.login(EMAIL_FROM, EMAIL_PASS)
+        return server
+
+    def send(self, msg: EmailMessage):
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # idle connections are dropped by the server, reconnect once
+            self._server = self._connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+
+
+class MailQueue:
+    def __init__(self, workers: int = MAIL_WORKERS):
+        self._workers_count = workers
+        self._queue: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._workers_count)]
+
+    async def stop(self, timeout: float = 10):
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def put(self, msg: EmailMessage) -> MailDelivery:
+        self.start()
+        delivery = MailDelivery(email_to=msg['To'], subject=msg['Subject'])
+        self._queue.put_nowait((delivery, msg))
+        return delivery
+
+    def put_many(self, messages: list[EmailMessage]) -> list[MailDelivery]:
+        return [self.put(msg) for msg in messages]
+
+    async def _worker(self):
+        connection = SMTPConnection()
+        try:
+            while True:
+                delivery, msg = await self._queue.get()
+                try:
+                    await self._deliver(connection, delivery, msg)
+                except Exception as e:
+                    # a message that cannot be sent at all must not take the worker down
+                    logger.exception("Mail to %s could not be sent", delivery.email_to)
+                    delivery.status = DeliveryStatus.failed
+                    delivery.last_error = str(e)
+                    await asyncio.to_thread(connection.close)
+                finally:
+                    self._queue.task_done()
+        finally:
+            await asyncio.to_thread(connection.close)
+
+    @staticmethod
+    async def _deliver(connection: SMTPConnection, delivery: MailDelivery, msg: EmailMessage):
+        delivery.status = DeliveryStatus.sending
+        while True:
+            delivery.attempts += 1
+            try:
+                await asyncio.to_thread(connection.send, msg)
+            except (smtplib.SMTPException, OSError) as error:
+                delivery.last_error = str(error)
+                await asyncio.to_thread(connection.close)
+                if delivery.attempts > MAIL_MAX_RETRIES:
+                    delivery.status = DeliveryStatus.failed
+                    return
+                await asyncio.sleep(MAIL_RETRY_DELAY * 2 ** (delivery.attempts - 1))
+            else:
+                delivery.status = DeliveryStatus.sent
+                delivery.sent_at = datetime.datetime.now()
+                return
+
+
+mail_queue = MailQueue()
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from types import MappingProxyType
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.auth.models import Role
+from src.benefit_requests.models import BenefitStatuses
+from src.benefits.models import Category
+from src.config import REFERENCE_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceData:
+    """Benefit statuses, roles and categories kept in memory.
+
+    Every refresh builds new read-only mappings and swaps them in at once, so
+    readers never see a half-loaded registry. The registry lives in each worker
+    process: an explicit refresh reloads only the worker that handles it, the
+    others reload on the periodic refresh every REFERENCE_REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.statuses: MappingProxyType | None = None
+        self.roles: MappingProxyType | None = None
+        self.categories: MappingProxyType | None = None
+
+    async def refresh(self, session: AsyncSession):
+        statuses = await session.exec(select(BenefitStatuses).order_by(BenefitStatuses.id))
+        roles = await session.exec(select(Role).order_by(Role.id))
+        categories = await session.exec(select(Category).order_by(Category.id))
+        categories = [Category(id=row.id, name=row.name, availability_interval=row.availability_interval)
+                      for row in categories.all()]
+        self.statuses, self.roles, self.categories = (
+            MappingProxyType({row.id: row.name for row in statuses.all()}),
+            MappingProxyType({row.id: row.name for row in roles.all()}),
+            MappingProxyType({category.id: category for category in categories}),
+        )
+
+    def invalidate(self):
+        self.statuses = self.roles = self.categories = None
+
+    async def load(self, session: AsyncSession):
+        if self.statuses is None:
+            await self.refresh(session)
+        return self
+
+    async def status_name(self, status_id: int, session: AsyncSession) -> str:
+        await self.load(session)
+        return self.statuses.get(status_id)
+
+
+reference = ReferenceData()
+
+
+async def run_reference_refresh(session_maker):
+    while True:
+        try:
+            async with session_maker() as session:
+                await reference.refresh(session)
+        except Exception:
+            logger.exception("Reference data could not be refreshed")
+        await asyncio.sleep(REFERENCE_REFRESH_INTERVAL)
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import re
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from fastapi import HTTPException
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+
+from src.config import STORAGE_BACKEND, STORAGE_ROOT, S3_BUCKET, S3_ENDPOINT_URL, S3_ACCESS_KEY, S3_SECRET_KEY, \
+    S3_REGION
+from src.storage.responses import file_response, REVALIDATE
+
+project_root = Path(__file__).resolve().parents[2]
+storage_root = Path(STORAGE_ROOT) if STORAGE_ROOT else project_root / "files"
+
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(-\d{1,5})?(\.\w{1,10})?$")
+SAFE_NAME = re.compile(r"^[\w-][\w.-]*$")
+
+
+def is_hashed_name(name: str) -> bool:
+    return HASHED_NAME.match(name) is not None
+
+
+def blob_key(name: str) -> str:
+    if not SAFE_NAME.match(name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    # content-addressed blobs are sharded by hash prefix, files saved
+    # before the store existed stay flat under their original name
+    if is_hashed_name(name):
+        return f"{name[:2]}/{name[2:4]}/{name}"
+    return name
+
+
+class StorageBackend(ABC):
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    @abstractmethod
+    def temp_path(self) -> Path:
+        """Path for a new temp file that put() can move into the store."""
+
+    @abstractmethod
+    async def put(self, name: str, source: Path):
+        """Move a finished temp file into the store under name."""
+
+    @abstractmethod
+    async def exists(self, name: str) -> bool:
+        """Whether a blob is stored under name."""
+
+    @abstractmethod
+    async def delete(self, name: str):
+        """Delete a blob, a missing one is not an error."""
+
+    @abstractmethod
+    async def list_names(self) -> list[tuple[str, float]]:
+        """Names of all stored blobs with their modification timestamps."""
+
+    @abstractmethod
+    async def response(self, name: str, request: Request, cache_control: str) -> Response:
+        """Serve a blob, cache_control applies to content-addressed names only."""
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, namespace: str, root: Path = storage_root):
+        super().__init__(namespace)
+        self.root = root / namespace
+        # temp files live inside the namespace so the final move is a rename
+        # even when every namespace is a separate volume
+        self.temp_root = self.root / ".tmp"
+
+    def path(self, name: str) -> Path:
+        return self.root / blob_key(name)
+
+    def temp_path(self) -> Path:
+        self.temp_root.mkdir(parents=True, exist_ok=True)
+        return self.temp_root / uuid.uuid4().hex
+
+    async def put(self, name: str, source: Path):
+        target = self.path(name)
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(os.replace, source, target)
+
+    async def exists(self, name: str) -> bool:
+        return await asyncio.to_thread(self.path(name).is_file)
+
+    async def delete(self, name: str):
+        try:
+            await asyncio.to_thread(os.remove, self.path(name))
+        except FileNotFoundError:
+            pass
+
+    async def list_names(self) -> list[tuple[str, float]]:
+        return await asyncio.to_thread(self._walk)
+
+    def _walk(self):
+        names = []
+        for directory, subdirectories, files in os.walk(self.root):
+            if directory == str(self.root):
+                subdirectories[:] = [item for item in subdirectories if item != ".tmp"]
+            for file in files:
+                names.append((file, os.path.getmtime(os.path.join(directory, file))))
+        return names
+
+    async def response(self, name: str, request: Request, cache_control: str) -> Response:
+        key = blob_key(name)
+        if is_hashed_name(name):
+            etag = f'"{name.split(".", 1)[0]}"'
+        else:
+            etag, cache_control = None, REVALIDATE
+        try:
+            return await asyncio.to_thread(file_response, request, self.root / key, etag, cache_control,
+                                           f"{self.namespace}/{key}")
+        except (FileNotFoundError, IsADirectoryError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+
+class S3Storage(StorageBackend):
+    def __init__(self, namespace: str):
+        super().__init__(namespace)
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("boto3 is required for STORAGE_BACKEND=s3")
+        self.client = boto3.client("s3",
+                                   endpoint_url=S3_ENDPOINT_URL,
+                                   aws_access_key_id=S3_ACCESS_KEY,
+                                   aws_secret_access_key=S3_SECRET_KEY,
+                                   region_name=S3_REGION)
+
+    def key(self, name: str) -> str:
+        return f"{self.namespace}/{blob_key(name)}"
+
+    def temp_path(self) -> Path:
+        return Path(tempfile.gettempdir()) / uuid.uuid4().hex
+
+    async def put(self, name: str, source: Path):
+        try:
+            await asyncio.to_thread(self.client.upload_file, str(source), S3_BUCKET, self.key(name))
+        finally:
+            await asyncio.to_thread(source.unlink, missing_ok=True)
+
+    async def exists(self, name: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=S3_BUCKET, Key=self.key(name))
+        except ClientError:
+            return False
+        return True
+
+    async def delete(self, name: str):
+        await asyncio.to_thread(self.client.delete_object, Bucket=S3_BUCKET, Key=self.key(name))
+
+    async def list_names(self) -> list[tuple[str, float]]:
+        return await asyncio.to_thread(self._list)
+
+    def _list(self):
+        names = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=S3_BUCKET, Prefix=f"{self.namespace}/"):
+            for item in page.get("Contents", []):
+                names.append((item["Key"].rsplit("/", 1)[-1], item["LastModified"].timestamp()))
+        return names
+
+    async def response(self, name: str, request: Request, cache_control: str) -> Response:
+        url = await asyncio.to_thread(self.client.generate_presigned_url, "get_object",
+                                      Params={"Bucket": S3_BUCKET, "Key": self.key(name)})
+        return RedirectResponse(url)
+
+
+_storages: dict[str, StorageBackend] = {}
+
+
+def get_storage(namespace: str) -> StorageBackend:
+    if namespace not in _storages:
+        match STORAGE_BACKEND:
+            case "local":
+                _storages[namespace] = LocalStorage(namespace)
+            case "s3":
+                _storages[namespace] = S3Storage(namespace)
+            case _:
+                raise RuntimeError(f"Unknown storage backend {STORAGE_BACKEND}")
+    return _storages[namespace]
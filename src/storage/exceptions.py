@@ -0,0 +1,6 @@
+class FileTooLarge(Exception):
+    pass
+
+
+class InvalidImage(Exception):
+    pass
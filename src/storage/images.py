@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from src.config import COVER_VARIANT_WIDTHS, COVER_VARIANT_FORMATS, IMAGE_WORKERS
+from src.storage.exceptions import InvalidImage
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def supported_formats() -> list[str]:
+    if Image is None:
+        return []
+    return [fmt for fmt in COVER_VARIANT_FORMATS if features.check(fmt)]
+
+
+def render_cover(source: str, target: str, digest: str, widths: list[int], formats: list[str]) \
+        -> list[tuple[str, str]]:
+    """Re-encode the original into target without metadata and resize it, returns the variants.
+
+    Runs in a worker process. Only the pixels and the transparency are kept, so
+    EXIF (GPS included), XMP, ICC profiles and comments of the upload are
+    dropped from the stored original as well as from the variants. An upload
+    Pillow cannot decode raises InvalidImage, a failure to render a variant
+    of a valid image is raised as is.
+    """
+    try:
+        with Image.open(source) as image:
+            image_format = image.format
+            if image_format not in Image.SAVE:
+                raise InvalidImage(f"Images in {image_format} format are not supported")
+            image = ImageOps.exif_transpose(image)
+            image.info = {key: value for key, value in image.info.items() if key == "transparency"}
+            image.save(target, image_format, quality=95)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImage(f"File is not a valid image: {e}")
+    if not formats or not widths:
+        return []
+    return render_variants(target, str(Path(target).parent), digest, widths, formats)
+
+
+def render_variants(source: str, out_dir: str, digest: str, widths: list[int], formats: list[str]) \
+        -> list[tuple[str, str]]:
+    """Resize an image to every width and format, returns (variant name, file path) pairs."""
+    variants = []
+    with Image.open(source) as image:
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        for width in widths:
+            resized = image
+            if image.width > width:
+                resized = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+            for fmt in formats:
+                name = f"{digest}-{width}.{fmt}"
+                path = str(Path(out_dir) / name)
+                resized.save(path, fmt.upper(), quality=80)
+                variants.append((name, path))
+    return variants
+
+
+async def make_cover(source: Path, target: Path, digest: str) -> list[tuple[str, Path]] | None:
+    """Write the cleaned original to target, returns its variants or None when Pillow is not installed."""
+    global _executor
+    if Image is None:
+        return None
+    if _executor is None:
+        # fork is unsafe in a process running threads, the workers start clean
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    loop = asyncio.get_running_loop()
+    try:
+        variants = await loop.run_in_executor(_executor, render_cover, str(source), str(target), digest,
+                                              COVER_VARIANT_WIDTHS, supported_formats())
+    except InvalidImage:
+        raise
+    except Exception:
+        # a cover without its variants would never get them, the upload fails instead
+        logger.exception("Variants of cover %s could not be rendered", digest)
+        raise
+    return [(name, Path(path)) for name, path in variants]
+
+
+def shutdown_image_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,15 @@
+import datetime
+
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlmodel import SQLModel, Field, Column, String
+
+
+class StoredFile(SQLModel, table=True):
+    __tablename__ = "stored_file"
+
+    namespace: str = Field(max_length=30, primary_key=True)
+    name: str = Field(max_length=80, primary_key=True)
+    size: int
+    ref_count: int = Field(default=0)
+    created_at: datetime.datetime | None = Field(default_factory=datetime.datetime.now)
+    variants: list[str] | None = Field(sa_column=Column(ARRAY(String), nullable=True), default=None)
@@ -0,0 +1,100 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+from src.config import STORAGE_SENDFILE, STORAGE_ACCEL_PREFIX, UPLOAD_CHUNK_SIZE
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _byte_range(request: Request, etag: str, size: int) -> tuple[int, int] | None:
+    range_header = request.headers.get("range")
+    if range_header is None:
+        return None
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range != etag:
+        return None
+    match = RANGE.match(range_header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if start == "":
+        if end == "":
+            return None
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        # a range ending before it starts is invalid, the header is ignored
+        if end != "" and int(end) < int(start):
+            return None
+        start, end = int(start), min(int(end), size - 1) if end != "" else size - 1
+    return start, end
+
+
+def _read_range(path: Path, start: int, end: int):
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(request: Request, path: Path, etag: str | None, cache_control: str,
+                  accel_path: str | None = None) -> Response:
+    stat_result = os.stat(path)
+    if etag is None:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+    headers = {
+        "etag": etag,
+        "cache-control": cache_control,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "accept-ranges": "bytes",
+    }
+
+    if _not_modified(request, etag, stat_result.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # let the reverse proxy send the body, it also takes care of ranges
+    if STORAGE_SENDFILE == "x-accel-redirect" and accel_path is not None:
+        return Response(headers={**headers, "x-accel-redirect": f"{STORAGE_ACCEL_PREFIX}/{accel_path}"})
+    if STORAGE_SENDFILE == "x-sendfile":
+        return Response(headers={**headers, "x-sendfile": str(path)})
+
+    byte_range = _byte_range(request, etag, stat_result.st_size)
+    if byte_range is not None:
+        start, end = byte_range
+        # a valid range that starts past the end or a zero suffix cannot be satisfied
+        if start > end or start >= stat_result.st_size:
+            return Response(status_code=416, headers={"content-range": f"bytes */{stat_result.st_size}"})
+        headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        headers["content-length"] = str(end - start + 1)
+        return StreamingResponse(_read_range(path, start, end), status_code=206, headers=headers,
+                                 media_type=mimetypes.guess_type(path)[0] or "application/octet-stream")
+
+    return FileResponse(path, headers=headers, stat_result=stat_result)
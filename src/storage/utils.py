@@ -0,0 +1,185 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+
+from fastapi import UploadFile
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.benefit_requests.models import UserBenefitRelation
+from src.benefits.models import Benefit
+from src.config import UPLOAD_MAX_SIZE, UPLOAD_CHUNK_SIZE, STORAGE_GC_INTERVAL, STORAGE_GC_GRACE
+from src.storage.backends import get_storage, is_hashed_name
+from src.storage.exceptions import FileTooLarge
+from src.storage.images import make_cover
+from src.storage.models import StoredFile
+
+logger = logging.getLogger(__name__)
+
+COVERS = "benefit_covers"
+RECEIPTS = "receipts"
+
+GC_LOCK_ID = 727001
+
+
+async def save_upload(file: UploadFile, path: Path, max_size: int = UPLOAD_MAX_SIZE) -> tuple[int, str]:
+    """Copy an upload to disk chunk by chunk, returns its size and sha256 hex digest."""
+    digest = hashlib.sha256()
+    size = 0
+    part_path = path.with_name(path.name + ".part")
+    output = await asyncio.to_thread(open, part_path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLarge(f"File {file.filename} is too large")
+            digest.update(chunk)
+            await asyncio.to_thread(output.write, chunk)
+    except BaseException:
+        await asyncio.to_thread(output.close)
+        await asyncio.to_thread(_remove, part_path)
+        raise
+    await asyncio.to_thread(output.close)
+    await asyncio.to_thread(os.replace, part_path, path)
+    return size, digest.hexdigest()
+
+
+def _remove(path: Path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _extension(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext[1:].isalnum() and len(ext) <= 11 else ""
+
+
+async def store_upload(file: UploadFile, namespace: str, session: AsyncSession) -> str:
+    """Store an upload by content hash and take a reference to it, returns the stored name.
+
+    The reference is written to the session, it counts once the caller commits.
+    """
+    name, _ = await _store(file, namespace, session, False)
+    return name
+
+
+async def store_image_upload(file: UploadFile, namespace: str, session: AsyncSession) -> tuple[str, list[str]]:
+    """Same as store_upload, also returns the names of the resized variants of the image."""
+    return await _store(file, namespace, session, True)
+
+
+async def _store(file: UploadFile, namespace: str, session: AsyncSession, with_variants: bool):
+    storage = get_storage(namespace)
+    temp_path = storage.temp_path()
+    size, digest = await save_upload(file, temp_path)
+    name = f"{digest}{_extension(file.filename)}"
+    temp_paths = [temp_path]
+    try:
+        # the reference is taken before the blob is checked, so a concurrent
+        # garbage collection either finishes first or skips this row
+        variants = await session.exec(insert(StoredFile).values(
+            namespace=namespace, name=name, size=size, ref_count=1,
+            created_at=datetime.datetime.now()).on_conflict_do_update(
+            index_elements=[StoredFile.namespace, StoredFile.name],
+            set_={"ref_count": StoredFile.ref_count + 1}).returning(StoredFile.variants))
+        variants = variants.scalar_one()
+        if await storage.exists(name):
+            await asyncio.to_thread(_remove, temp_path)
+            return name, variants or []
+
+        variants = []
+        upload_path = temp_path
+        if with_variants:
+            # the blob keeps the name of the upload digest, its content is the cleaned image
+            cover_path = storage.temp_path()
+            temp_paths.append(cover_path)
+            rendered = await make_cover(temp_path, cover_path, digest)
+            if rendered is not None:
+                upload_path = cover_path
+                temp_paths.extend(path for _, path in rendered)
+                for variant_name, variant_path in rendered:
+                    await storage.put(variant_name, variant_path)
+                    variants.append(variant_name)
+            await session.exec(update(StoredFile).where(StoredFile.namespace == namespace).
+                               where(StoredFile.name == name).values(variants=variants))
+        await storage.put(name, upload_path)
+        if upload_path != temp_path:
+            await asyncio.to_thread(_remove, temp_path)
+    except BaseException:
+        for path in temp_paths:
+            await asyncio.to_thread(_remove, path)
+        raise
+    return name, variants
+
+
+async def release_file(name: str, namespace: str, session: AsyncSession):
+    if not is_hashed_name(name):
+        await get_storage(namespace).delete(name)
+        return
+    stored_file = await session.get(StoredFile, (namespace, name))
+    if stored_file is not None and stored_file.ref_count > 0:
+        stored_file.ref_count -= 1
+        session.add(stored_file)
+
+
+async def collect_garbage(session: AsyncSession):
+    """Recount references and delete blobs nobody has used for STORAGE_GC_GRACE seconds."""
+    locked = await session.exec(select(func.pg_try_advisory_xact_lock(GC_LOCK_ID)))
+    if not locked.one():
+        return
+
+    references = {
+        COVERS: select(Benefit.cover_path).where(Benefit.cover_path.is_not(None)),
+        RECEIPTS: select(func.unnest(UserBenefitRelation.files)),
+    }
+    deadline = datetime.datetime.now() - datetime.timedelta(seconds=STORAGE_GC_GRACE)
+    for namespace, statement in references.items():
+        storage = get_storage(namespace)
+        # rows locked by uploads in flight are left for the next run
+        stored_files = await session.exec(select(StoredFile).where(StoredFile.namespace == namespace).
+                                          with_for_update(skip_locked=True))
+        stored_files = stored_files.all()
+        # references are counted only once the rows are locked: an upload that
+        # references one of them has either committed and is counted, or waits
+        # on the lock in its upsert until this run commits
+        referenced = await session.exec(statement)
+        referenced = Counter(name for name in referenced.all() if name is not None)
+
+        known = await session.exec(select(StoredFile.name).where(StoredFile.namespace == namespace))
+        known = set(known.all())
+        for stored_file in stored_files:
+            stored_file.ref_count = referenced[stored_file.name]
+            if stored_file.ref_count == 0 and stored_file.created_at < deadline:
+                await storage.delete(stored_file.name)
+                await session.delete(stored_file)
+                known.discard(stored_file.name)
+            else:
+                session.add(stored_file)
+
+        # resized variants live as long as the blob they were made from
+        live_digests = {name[:64] for name in known if is_hashed_name(name)}
+        for name, modified_at in await storage.list_names():
+            if name in known or name in referenced or modified_at >= deadline.timestamp():
+                continue
+            if is_hashed_name(name) and name[:64] in live_digests:
+                continue
+            await storage.delete(name)
+
+
+async def run_storage_gc(session_maker):
+    while True:
+        await asyncio.sleep(STORAGE_GC_INTERVAL)
+        try:
+            async with session_maker() as session:
+                await collect_garbage(session)
+                await session.commit()
+        except Exception:
+            logger.exception("Storage garbage collection failed")
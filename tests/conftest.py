@@ -0,0 +1,116 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.admin.models import *
+from src.analitycs.models import *
+from src.auth.models import *
+from src.benefit_requests.models import *
+from src.benefits.models import *
+from src.storage.models import *
+
+SEED = [
+    "INSERT INTO role VALUES (1, 'HR'), (2, 'employee')",
+    "INSERT INTO benefit_statuses VALUES (1, 'в обработке'), (2, 'одобрена'), (3, 'отклонена'), (4, 'завершена')",
+    "INSERT INTO poll_status VALUES (FALSE, 0)",
+]
+
+
+def _trigram_indexes():
+    return [(table, index) for table in SQLModel.metadata.sorted_tables for index in table.indexes
+            if "gin_trgm_ops" in index.dialect_options["postgresql"]["ops"].values()]
+
+
+async def _create_schema(url: str):
+    engine = create_async_engine(url, poolclass=NullPool)
+    async with engine.begin() as connection:
+        has_trigrams = await connection.scalar(
+            text("SELECT count(*) FROM pg_available_extensions WHERE name = 'pg_trgm'"))
+        if has_trigrams:
+            await connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        # without pg_trgm the directory search still works, only slower
+        skipped = [] if has_trigrams else _trigram_indexes()
+        for table, index in skipped:
+            table.indexes.discard(index)
+        try:
+            await connection.run_sync(SQLModel.metadata.drop_all)
+            await connection.run_sync(SQLModel.metadata.create_all)
+        finally:
+            for table, index in skipped:
+                table.indexes.add(index)
+        await connection.execute(text("CREATE TABLE poll_results_default PARTITION OF poll_results DEFAULT"))
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    """A Postgres database with the current schema.
+
+    TEST_DATABASE_URL points at a database the tests may wipe, without it a
+    throwaway server is started with pgserver. Tests needing the database are
+    skipped when neither is available.
+    """
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url is None:
+        try:
+            import pgserver
+        except ImportError:
+            pytest.skip("TEST_DATABASE_URL is not set and pgserver is not installed")
+        server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+        url = server.get_uri().replace("postgresql://", "postgresql+asyncpg://", 1)
+    asyncio.run(_create_schema(url))
+    return url
+
+
+@pytest.fixture
+def session_maker(database_url):
+    """Session factory on an empty, seeded database.
+
+    Connections are not pooled, so every asyncio.run of a test gets its own.
+    """
+    async def reset():
+        async with engine.begin() as connection:
+            tables = ", ".join(f'"{table.name}"' for table in SQLModel.metadata.sorted_tables)
+            await connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+            for statement in SEED:
+                await connection.execute(text(statement))
+
+    engine = create_async_engine(database_url, poolclass=NullPool)
+    asyncio.run(reset())
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class Database:
+    """Runs one statement or change per asyncio.run, for tests that are not async themselves."""
+
+    def __init__(self, session_maker):
+        self.session_maker = session_maker
+
+    def run(self, function):
+        """Await function(session) in a fresh session, returns its result."""
+        async def run():
+            async with self.session_maker() as session:
+                return await function(session)
+        return asyncio.run(run())
+
+    def add(self, *instances):
+        async def add(session):
+            session.add_all(instances)
+            await session.commit()
+        self.run(add)
+
+    def all(self, statement) -> list:
+        async def fetch(session):
+            return (await session.exec(statement)).all()
+        return self.run(fetch)
+
+
+@pytest.fixture
+def db(session_maker):
+    return Database(session_maker)
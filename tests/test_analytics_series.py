@@ -0,0 +1,83 @@
+import datetime
+import uuid
+
+import pytest
+
+from src.admin.models import UserInfoTable
+from src.analitycs.utils import get_requests_series, get_approval_latency, get_usage_by, record_request_created
+from src.auth.models import User
+from src.benefit_requests.models import UserBenefitRelation
+from src.benefits.models import Benefit
+
+JAN = datetime.datetime(2024, 1, 10, 9)
+FEB = datetime.datetime(2024, 2, 5, 9)
+
+
+@pytest.fixture
+def requests(db):
+    """Gym: approved after 2 h and 10 h in January, denied after 4 h in February. Pool: waiting in February."""
+    users = [User(id=uuid.uuid4(), email=f"{name}@example.com", email_verified=True, active_user=True, role_id=2)
+             for name in ("ann", "bob", "carl")]
+    gym, pool = Benefit(name="Gym"), Benefit(name="Pool")
+    db.add(*users, gym, pool)
+    db.add(UserInfoTable(user_id=users[0].id, place_of_employment="Moscow",
+                         employment_date=datetime.date.today() - datetime.timedelta(days=30)),
+           UserInfoTable(user_id=users[1].id, place_of_employment="Moscow",
+                         employment_date=datetime.date.today() - datetime.timedelta(days=800)),
+           UserInfoTable(user_id=users[2].id, place_of_employment="Kazan"))
+    rows = [
+        (users[0], gym, JAN, 2, 2),
+        (users[1], gym, JAN + datetime.timedelta(days=1), 2, 10),
+        (users[0], gym, FEB, 3, 4),
+        (users[1], pool, FEB, 1, None),
+    ]
+    relations = [UserBenefitRelation(user_id=user.id, benefit_id=benefit.id, created_at=created_at, status=status,
+                                     status_changed_at=None if hours is None else
+                                     created_at + datetime.timedelta(hours=hours))
+                 for user, benefit, created_at, status, hours in rows]
+
+    async def create(session):
+        session.add_all(relations)
+        for relation in relations:
+            await record_request_created(session, relation.benefit_id, relation.user_id, relation.status)
+        await session.commit()
+
+    db.run(create)
+    return gym, pool
+
+
+def test_requests_are_bucketed_by_month(db, requests):
+    gym, pool = requests
+    series = db.run(lambda session: get_requests_series("month", session))
+    assert [(item["period"], item["name"], item["total"], item["waiting"], item["approved"], item["denied"])
+            for item in series] == [
+        (datetime.date(2024, 1, 1), "Gym", 2, 0, 2, 0),
+        (datetime.date(2024, 2, 1), "Gym", 1, 0, 0, 1),
+        (datetime.date(2024, 2, 1), "Pool", 1, 1, 0, 0),
+    ]
+    february = db.run(lambda session: get_requests_series("month", session, gym.id, datetime.date(2024, 2, 5),
+                                                          datetime.date(2024, 2, 5)))
+    assert [(item["period"], item["total"]) for item in february] == [(datetime.date(2024, 2, 1), 1)]
+
+
+def percentiles(item: dict) -> list[float]:
+    return [float(item[key]) for key in ("p50", "p90", "p99")]
+
+
+def test_latency_percentiles(db, requests):
+    gym, pool = requests
+    overall = db.run(get_approval_latency)
+    assert overall["decided"] == 3
+    assert percentiles(overall) == [4.0, 8.8, 9.88]
+    january = datetime.date(2024, 1, 31)
+    [gym_latency] = db.run(lambda session: get_approval_latency(session, by_benefit=True, date_to=january))
+    assert (gym_latency["benefit_id"], gym_latency["name"], gym_latency["decided"]) == (gym.id, "Gym", 2)
+    assert percentiles(gym_latency) == [6.0, 9.2, 9.92]
+
+
+def test_usage_by_group(db, requests):
+    places = db.run(lambda session: get_usage_by("place_of_employment", session))
+    assert [(item["place_of_employment"], item["employees"], item["benefit_users"], item["requests"])
+            for item in places] == [("Kazan", 1, 0, 0), ("Moscow", 2, 2, 4)]
+    tenure = {item["tenure"]: item["benefit_users"] for item in db.run(lambda session: get_usage_by("tenure", session))}
+    assert tenure == {"до 3 месяцев": 1, "до 3 лет": 1, "не указан": 0}
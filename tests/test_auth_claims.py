@@ -0,0 +1,80 @@
+import asyncio
+import time
+import uuid
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src.auth import utils
+from src.auth.models import User
+from src.auth.utils import get_current_user, get_current_admin, user_cache
+
+SECRET_KEY = "test-secret-key-used-only-by-the-tests"
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(utils, "SECRET_KEY", SECRET_KEY)
+    user_cache.invalidate()
+    yield
+    user_cache.invalidate()
+
+
+def credentials(claims: dict) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=jwt.encode(claims, SECRET_KEY, "HS256"))
+
+
+def claims(user_id: uuid.UUID, **extra) -> dict:
+    return {"sub": str(user_id), "email": "user@example.com", "role": 2, "active": True,
+            "claims_exp": int(time.time()) + 60, **extra}
+
+
+def test_claims_answer_without_the_database():
+    user_id = uuid.uuid4()
+    # no session is given, a database read would fail
+    user = asyncio.run(get_current_user(credentials(claims(user_id, verified=False)), None))
+    assert user.id == user_id
+    assert user.email_verified is False
+    assert user.role_id == 2
+
+
+def test_claims_without_verified_flag_use_the_cache():
+    user_id = uuid.uuid4()
+    cached = User(id=user_id, email="user@example.com", email_verified=True, active_user=True, role_id=1)
+    user_cache.set(str(user_id), cached)
+    user = asyncio.run(get_current_user(credentials(claims(user_id)), None))
+    assert user is cached
+
+
+def test_expired_claims_use_the_cache():
+    user_id = uuid.uuid4()
+    cached = User(id=user_id, email="user@example.com", email_verified=True, active_user=True, role_id=2)
+    user_cache.set(str(user_id), cached)
+    expired = claims(user_id, verified=True, role=1, claims_exp=int(time.time()) - 1)
+    assert asyncio.run(get_current_user(credentials(expired), None)).role_id == 2
+
+
+def test_inactive_user_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_current_user(credentials(claims(uuid.uuid4(), verified=True, active=False)), None))
+    assert error.value.status_code == 403
+
+
+def test_admin_is_checked_against_the_database(db):
+    admin = User(id=uuid.uuid4(), email="admin@example.com", email_verified=True, active_user=True, role_id=1)
+    demoted = User(id=uuid.uuid4(), email="demoted@example.com", email_verified=True, active_user=True, role_id=2)
+    deleted = User(id=uuid.uuid4(), email="deleted@example.com", email_verified=True, active_user=False, role_id=1)
+    db.add(admin, demoted, deleted)
+
+    def check(user_id: uuid.UUID):
+        # the claims still say admin and active, the database decides
+        user = asyncio.run(get_current_user(credentials(claims(user_id, verified=True, role=1)), None))
+        return db.run(lambda session: get_current_admin(user, session))
+
+    assert check(admin.id).id == admin.id
+    for user_id, status_code in ((demoted.id, 405), (deleted.id, 403), (uuid.uuid4(), 403)):
+        with pytest.raises(HTTPException) as error:
+            check(user_id)
+        assert error.value.status_code == status_code
@@ -0,0 +1,105 @@
+import datetime
+import uuid
+
+import pytest
+from sqlmodel import select
+
+from src.auth import utils
+from src.auth.exceptions import InvalidToken, TooManyLinks
+from src.auth.models import User, AuthToken
+from src.auth.utils import hash_token, token_expired, create_auth_token, verify_auth_token, check_login_rate, \
+    purge_auth_tokens
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(utils, "SECRET_KEY", "test-secret-key-used-only-by-the-tests")
+    monkeypatch.setattr(utils, "AUTH_TOKEN_TTL", 900)
+    monkeypatch.setattr(utils, "INVITE_TOKEN_TTL", 86400)
+
+
+def add_user(db, email_verified: bool = True) -> User:
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4().hex}@example.com", email_verified=email_verified,
+                active_user=True, role_id=2)
+    db.add(user)
+    return user
+
+
+def issue(db, user: User, age: datetime.timedelta = datetime.timedelta()) -> str:
+    auth_token, link = create_auth_token(user.id)
+    auth_token.create_date = datetime.datetime.now() - age
+    db.add(auth_token)
+    return link.rsplit("/", 1)[1]
+
+
+def test_hash_token():
+    assert hash_token("abc") == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    assert len(hash_token("x" * 27)) == 64
+
+
+def test_only_the_hash_is_stored():
+    auth_token, link = create_auth_token(uuid.uuid4())
+    token = link.rsplit("/", 1)[1]
+    assert auth_token.token == hash_token(token)
+    assert token not in auth_token.token
+
+
+def test_token_expired():
+    now = datetime.datetime.now()
+    assert not token_expired(now - datetime.timedelta(minutes=10), True)
+    assert token_expired(now - datetime.timedelta(minutes=20), True)
+    # tokens of users who have not verified their email are invites
+    assert not token_expired(now - datetime.timedelta(hours=20), False)
+    assert token_expired(now - datetime.timedelta(hours=25), False)
+
+
+def test_token_is_single_use(db):
+    token = issue(db, add_user(db))
+    assert "success" in db.run(lambda session: verify_auth_token(token, session))
+    with pytest.raises(InvalidToken):
+        db.run(lambda session: verify_auth_token(token, session))
+
+
+def test_invite_verifies_the_user(db):
+    user = add_user(db, email_verified=False)
+    token = issue(db, user, datetime.timedelta(hours=1))
+    db.run(lambda session: verify_auth_token(token, session))
+    assert db.all(select(User.email_verified).where(User.id == user.id)) == [True]
+
+
+def test_expired_token_is_rejected_and_removed(db):
+    token = issue(db, add_user(db), datetime.timedelta(hours=1))
+    with pytest.raises(InvalidToken):
+        db.run(lambda session: verify_auth_token(token, session))
+    assert db.all(select(AuthToken)) == []
+
+
+def test_unknown_token_is_rejected(db):
+    with pytest.raises(InvalidToken):
+        db.run(lambda session: verify_auth_token("unknown", session))
+
+
+def test_login_rate_limit(db, monkeypatch):
+    monkeypatch.setattr(utils, "LOGIN_RATE_LIMIT", 2)
+    monkeypatch.setattr(utils, "LOGIN_RATE_WINDOW", 600)
+    user, other = add_user(db), add_user(db)
+    issue(db, user, datetime.timedelta(hours=1))
+    issue(db, user)
+    issue(db, other)
+    db.run(lambda session: check_login_rate(user.id, session))
+    issue(db, user)
+    with pytest.raises(TooManyLinks):
+        db.run(lambda session: check_login_rate(user.id, session))
+
+
+def test_purge_removes_only_expired_tokens(db, monkeypatch):
+    monkeypatch.setattr(utils, "AUTH_TOKEN_PURGE_BATCH", 1)
+    verified, invited = add_user(db), add_user(db, email_verified=False)
+    issue(db, verified, datetime.timedelta(hours=1))
+    fresh_login = issue(db, verified)
+    open_invite = issue(db, invited, datetime.timedelta(hours=1))
+    issue(db, invited, datetime.timedelta(days=2))
+
+    assert db.run(purge_auth_tokens) == 2
+    remaining = set(db.all(select(AuthToken.token)))
+    assert remaining == {hash_token(fresh_login), hash_token(open_invite)}
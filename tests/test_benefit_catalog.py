@@ -0,0 +1,50 @@
+import datetime
+import uuid
+
+import pytest
+
+from src.admin.models import UserInfoTable
+from src.auth.models import User
+from src.benefits.models import Benefit, Category
+from src.benefits.utils import get_benefits, invalidate_catalog
+
+
+@pytest.fixture
+def catalog(db):
+    invalidate_catalog()
+    db.add(Category(name="Starter", availability_interval=datetime.timedelta(days=90)), Category(name="Senior"))
+    db.add(Benefit(name="Gym", categories=[1]), Benefit(name="Pool", categories=[1, 2]),
+           Benefit(name="Car", categories=[2]), Benefit(name="Draft"))
+    yield
+    invalidate_catalog()
+
+
+def user(db, role_id: int, days_employed: int) -> User:
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4().hex}@example.com", email_verified=True, active_user=True,
+                role_id=role_id)
+    db.add(user)
+    db.add(UserInfoTable(user_id=user.id,
+                         employment_date=datetime.date.today() - datetime.timedelta(days=days_employed)))
+    return user
+
+
+def names(db, user: User) -> list[str]:
+    return [benefit.name for benefit in db.run(lambda session: get_benefits(user, session))]
+
+
+def test_each_tier_sees_its_benefits(db, catalog):
+    assert names(db, user(db, 1, 0)) == ["Gym", "Pool", "Car", "Draft"]
+    assert names(db, user(db, 2, 0)) == ["Gym", "Pool"]
+    assert names(db, user(db, 2, 100)) == ["Gym", "Pool", "Car"]
+
+
+def test_tiers_are_cached_until_invalidated(db, catalog):
+    newcomer, veteran = user(db, 2, 0), user(db, 2, 100)
+    assert names(db, newcomer) == ["Gym", "Pool"]
+    db.add(Benefit(name="Spa", categories=[1]))
+    # the cached tier is served, the tier of the veteran is loaded fresh
+    assert names(db, newcomer) == ["Gym", "Pool"]
+    assert names(db, veteran) == ["Gym", "Pool", "Car", "Spa"]
+
+    invalidate_catalog()
+    assert names(db, newcomer) == ["Gym", "Pool", "Spa"]
@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+from starlette.testclient import TestClient
+
+from src.app import app
+from src.auth.models import User
+from src.auth.utils import get_current_admin
+from src.benefits import router
+from src.database import get_session
+
+
+@pytest.fixture
+def client(monkeypatch):
+    uploads = []
+
+    async def update_cover(benefit_id, image, session):
+        uploads.append((benefit_id, image and image.filename))
+        return None if image is None else f"/benefits/images/{image.filename}"
+
+    monkeypatch.setattr(router, "update_cover", update_cover)
+    app.dependency_overrides[get_session] = lambda: None
+    app.dependency_overrides[get_current_admin] = lambda: User(id=uuid.uuid4(), email="admin@example.com",
+                                                               email_verified=True, active_user=True, role_id=1)
+    yield TestClient(app), uploads
+    app.dependency_overrides.clear()
+
+
+def test_cover_is_uploaded(client):
+    client, uploads = client
+    response = client.post("/benefits/1/cover", files={"image": ("cover.png", b"png", "image/png")})
+    assert response.status_code == 200
+    assert uploads == [(1, "cover.png")]
+
+
+def test_cover_must_be_an_image(client):
+    client, uploads = client
+    response = client.post("/benefits/1/cover", files={"image": ("notes.txt", b"text", "text/plain")})
+    assert response.status_code == 400
+    assert uploads == []
+
+
+def test_cover_is_removed_without_an_image(client):
+    client, uploads = client
+    response = client.post("/benefits/1/cover")
+    assert response.status_code == 200
+    assert response.json() == {"success": None}
+    assert uploads == [(1, None)]
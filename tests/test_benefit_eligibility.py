@@ -0,0 +1,40 @@
+import datetime
+import uuid
+
+import pytest
+
+from src.admin.models import UserInfoTable
+from src.auth.models import User
+from src.benefits.models import Category
+from src.benefits.utils import eligible_categories_statement
+
+
+@pytest.fixture
+def categories(db):
+    db.add(Category(name="Starter", availability_interval=datetime.timedelta(days=90)),
+           Category(name="Regular", availability_interval=datetime.timedelta(days=365)),
+           Category(name="Senior"))
+
+
+def employee(db, days_employed: int | None) -> uuid.UUID:
+    user = User(id=uuid.uuid4(), email=f"{uuid.uuid4().hex}@example.com", email_verified=True, active_user=True,
+                role_id=2)
+    employment_date = None
+    if days_employed is not None:
+        employment_date = datetime.date.today() - datetime.timedelta(days=days_employed)
+    db.add(user)
+    db.add(UserInfoTable(user_id=user.id, employment_date=employment_date))
+    return user.id
+
+
+@pytest.mark.parametrize("days_employed, eligible", [
+    (None, [1]),
+    (0, [1]),
+    (90, [1]),
+    (91, [1, 2]),
+    (365, [1, 2]),
+    (366, [1, 2, 3]),
+])
+def test_categories_open_with_tenure(db, categories, days_employed, eligible):
+    # a category opens after the availability interval of the category before it
+    assert db.all(eligible_categories_statement(employee(db, days_employed))) == eligible
@@ -0,0 +1,103 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import select
+
+from src.analitycs.models import BenefitRequestStats, UserRequestStats
+from src.analitycs.utils import record_request_created
+from src.auth.models import User
+from src.benefit_requests.models import RequestsStatusChange, RequestFilters, UserBenefitRelation
+from src.benefit_requests.utils import bulk_outcomes, bulk_status_deltas, change_requests_status, BULK_FROM_STATUS
+from src.benefits.models import Benefit
+
+
+def test_outcomes_follow_request_ids():
+    results = bulk_outcomes("apply", [5, 3, 9, 7], [3, 7], {5: 2})
+    assert results == [
+        {"request_id": 5, "outcome": "invalid_transition", "status": 2},
+        {"request_id": 3, "outcome": "applied"},
+        {"request_id": 9, "outcome": "not_found"},
+        {"request_id": 7, "outcome": "applied"},
+    ]
+
+
+def test_outcomes_for_filters():
+    assert bulk_outcomes("deny", None, [4, 2], {}) == [
+        {"request_id": 4, "outcome": "denied"},
+        {"request_id": 2, "outcome": "denied"},
+    ]
+
+
+def test_status_deltas():
+    assert bulk_status_deltas([(1, 10), (2, 10), (3, 11)], 3) == {
+        (10, BULK_FROM_STATUS): -2, (10, 3): 2,
+        (11, BULK_FROM_STATUS): -1, (11, 3): 1,
+    }
+
+
+@pytest.mark.parametrize("change", [
+    RequestsStatusChange(action="apply"),
+    RequestsStatusChange(action="apply", request_ids=[1], filters=RequestFilters(status=1)),
+    RequestsStatusChange(action="apply", filters=RequestFilters()),
+])
+def test_invalid_selection_is_rejected(change):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(change_requests_status(change, None))
+    assert error.value.status_code == 400
+
+
+def add_requests(db, requests: list[tuple[int, int]]) -> list[int]:
+    """Creates (benefit index, status) requests of one user, returns their ids."""
+    user = User(id=uuid.uuid4(), email="user@example.com", email_verified=True, active_user=True, role_id=2)
+    benefits = [Benefit(name="Gym"), Benefit(name="Pool")]
+    db.add(user, *benefits)
+
+    async def create(session):
+        relations = [UserBenefitRelation(user_id=user.id, benefit_id=benefits[benefit].id, status=request_status)
+                     for benefit, request_status in requests]
+        session.add_all(relations)
+        await session.flush()
+        for relation in relations:
+            await record_request_created(session, relation.benefit_id, user.id, relation.status)
+        await session.commit()
+        return [relation.id for relation in relations]
+
+    return db.run(create)
+
+
+def counters(db) -> dict[tuple[int, int], int]:
+    stats = db.all(select(Benefit.name, BenefitRequestStats.status, BenefitRequestStats.count).join(Benefit))
+    return {(name, request_status): count for name, request_status, count in stats if count != 0}
+
+
+def test_requests_are_applied_by_id(db):
+    gym, pool, approved = add_requests(db, [(0, 1), (1, 1), (0, 2)])
+    change = RequestsStatusChange(action="apply", request_ids=[pool, approved, gym, 999])
+
+    result = db.run(lambda session: change_requests_status(change, session))
+
+    assert result["updated"] == 2
+    assert result["results"] == [
+        {"request_id": pool, "outcome": "applied"},
+        {"request_id": approved, "outcome": "invalid_transition", "status": 2},
+        {"request_id": gym, "outcome": "applied"},
+        {"request_id": 999, "outcome": "not_found"},
+    ]
+    assert dict(db.all(select(UserBenefitRelation.id, UserBenefitRelation.status))) == \
+        {gym: 2, pool: 2, approved: 2}
+    assert counters(db) == {("Gym", 2): 2, ("Pool", 2): 1}
+
+
+def test_requests_are_denied_by_filter(db):
+    add_requests(db, [(0, 1), (0, 1), (1, 1)])
+    benefit_id = db.all(select(Benefit.id).where(Benefit.name == "Gym"))[0]
+    change = RequestsStatusChange(action="deny", filters=RequestFilters(benefit_id=benefit_id))
+
+    result = db.run(lambda session: change_requests_status(change, session))
+
+    assert result["updated"] == 2
+    assert {outcome["outcome"] for outcome in result["results"]} == {"denied"}
+    assert counters(db) == {("Gym", 3): 2, ("Pool", 1): 1}
+    assert db.all(select(UserRequestStats.requests)) == [3]
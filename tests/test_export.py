@@ -0,0 +1,68 @@
+import asyncio
+import csv
+import datetime
+import io
+import uuid
+import zipfile
+
+import pytest
+from starlette.testclient import TestClient
+
+from src import export
+from src.admin.models import UserInfoTable
+from src.app import app
+from src.auth.models import User
+from src.auth.utils import get_current_admin
+from src.admin.utils import export_users_statement, USER_EXPORT_HEADER
+
+NAMES = ["Ann Smith", "Bob Brown", "Carl Green", "Dora White", "Егор Иванов"]
+
+
+@pytest.fixture
+def users(db, session_maker, monkeypatch):
+    monkeypatch.setattr(export, "async_session_maker", session_maker)
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    for number, name in enumerate(NAMES):
+        user = User(id=uuid.uuid4(), email=f"user{number}@example.com", email_verified=True, active_user=True,
+                    role_id=1 if number == 0 else 2)
+        db.add(user)
+        db.add(UserInfoTable(user_id=user.id, full_name=name, position="Engineer",
+                             employment_date=datetime.date(2020, 1, 1)))
+
+
+def collect(chunks) -> list[bytes]:
+    async def run():
+        return [chunk async for chunk in chunks]
+    return asyncio.run(run())
+
+
+def test_csv_is_streamed_per_batch(users):
+    chunks = collect(export._csv_chunks(export_users_statement(), USER_EXPORT_HEADER))
+    # three batches of at most two rows, the header goes out with the first
+    assert len(chunks) == 3
+    text = b"".join(chunks).decode("utf-8")
+    assert text.startswith("\ufeff")
+    rows = list(csv.reader(io.StringIO(text[1:])))
+    assert rows[0] == USER_EXPORT_HEADER
+    assert [row[2] for row in rows[1:]] == NAMES
+    assert rows[1][1] == "user0@example.com" and rows[1][6] == "True"
+
+
+def test_xlsx_is_a_complete_workbook(users):
+    content = b"".join(collect(export._xlsx_chunks(export_users_statement(), USER_EXPORT_HEADER)))
+    with zipfile.ZipFile(io.BytesIO(content)) as workbook:
+        assert "xl/worksheets/sheet1.xml" in workbook.namelist()
+        xml = "".join(workbook.read(name).decode("utf-8") for name in workbook.namelist() if name.endswith(".xml"))
+    assert all(name in xml for name in NAMES)
+
+
+def test_export_endpoint(users):
+    app.dependency_overrides[get_current_admin] = lambda: None
+    try:
+        response = TestClient(app).get("/admin/export/users", params={"format": "csv", "search": "smith"})
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    assert response.headers["content-disposition"].startswith('attachment; filename="users-')
+    assert len(response.text.splitlines()) == 2
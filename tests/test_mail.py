@@ -0,0 +1,165 @@
+import asyncio
+from email.message import EmailMessage
+
+import pytest
+
+from src.mail import utils
+from src.mail.models import DeliveryStatus
+from src.mail.utils import MailQueue, SMTPConnection
+
+
+class LocalSMTPServer:
+    """Minimal SMTP stand-in, answers the first fail_data messages with 451."""
+
+    def __init__(self, fail_data: int = 0):
+        self.fail_data = fail_data
+        self.messages: list[bytes] = []
+        self.commands: list[str] = []
+        self.port: int | None = None
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 localhost ESMTP")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip().split(" ", 1)[0].upper()
+                self.commands.append(command)
+                if command in ("EHLO", "HELO"):
+                    await reply("250 localhost")
+                elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    if self.fail_data > 0:
+                        self.fail_data -= 1
+                        await reply("451 Try again later")
+                    else:
+                        self.messages.append(data)
+                        await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+
+@pytest.fixture
+def smtp_settings(monkeypatch):
+    monkeypatch.setattr(utils, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(utils, "SMTP_USE_SSL", False)
+    monkeypatch.setattr(utils, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(utils, "EMAIL_PASS", None)
+    monkeypatch.setattr(utils, "MAIL_MAX_RETRIES", 2)
+    monkeypatch.setattr(utils, "MAIL_RETRY_DELAY", 0)
+    return monkeypatch
+
+
+def build_message(email_to: str = "user@example.com") -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "benefits@example.com"
+    msg["To"] = email_to
+    msg["Subject"] = "Test"
+    msg.set_content("test")
+    return msg
+
+
+async def deliver(server: LocalSMTPServer, monkeypatch, messages: list[EmailMessage]):
+    monkeypatch.setattr(utils, "SMTP_PORT", server.port)
+    queue = MailQueue(workers=1)
+    deliveries = queue.put_many(messages)
+    await queue.stop()
+    return deliveries
+
+
+def test_delivery_is_sent(smtp_settings):
+    async def run():
+        async with LocalSMTPServer() as server:
+            deliveries = await deliver(server, smtp_settings, [build_message()])
+        return server, deliveries
+
+    server, [delivery] = asyncio.run(run())
+    assert delivery.status == DeliveryStatus.sent
+    assert delivery.attempts == 1
+    assert delivery.sent_at is not None
+    assert len(server.messages) == 1
+
+
+def test_delivery_is_retried(smtp_settings):
+    async def run():
+        async with LocalSMTPServer(fail_data=1) as server:
+            deliveries = await deliver(server, smtp_settings, [build_message()])
+        return server, deliveries
+
+    server, [delivery] = asyncio.run(run())
+    assert delivery.status == DeliveryStatus.sent
+    assert delivery.attempts == 2
+    assert "Try again later" in delivery.last_error
+    assert len(server.messages) == 1
+
+
+def test_delivery_fails_after_retries(smtp_settings):
+    async def run():
+        async with LocalSMTPServer(fail_data=10) as server:
+            deliveries = await deliver(server, smtp_settings, [build_message()])
+        return server, deliveries
+
+    server, [delivery] = asyncio.run(run())
+    assert delivery.status == DeliveryStatus.failed
+    assert delivery.attempts == utils.MAIL_MAX_RETRIES + 1
+    assert server.messages == []
+
+
+def test_unexpected_error_keeps_worker_running(smtp_settings):
+    send = SMTPConnection.send
+
+    def broken_send(connection, msg):
+        if msg["To"] == "broken@example.com":
+            raise ValueError("broken message")
+        send(connection, msg)
+
+    smtp_settings.setattr(SMTPConnection, "send", broken_send)
+
+    async def run():
+        async with LocalSMTPServer() as server:
+            deliveries = await deliver(server, smtp_settings,
+                                       [build_message("broken@example.com"), build_message()])
+        return server, deliveries
+
+    server, [broken, delivery] = asyncio.run(run())
+    assert broken.status == DeliveryStatus.failed
+    assert broken.attempts == 1
+    assert broken.last_error == "broken message"
+    assert delivery.status == DeliveryStatus.sent
+    assert len(server.messages) == 1
+
+
+def test_password_is_not_sent_without_tls(smtp_settings):
+    smtp_settings.setattr(utils, "SMTP_STARTTLS", True)
+    smtp_settings.setattr(utils, "EMAIL_PASS", "secret")
+
+    async def run():
+        async with LocalSMTPServer() as server:
+            deliveries = await deliver(server, smtp_settings, [build_message()])
+        return server, deliveries
+
+    server, [delivery] = asyncio.run(run())
+    # the stand-in does not offer STARTTLS, so the connection is refused before AUTH
+    assert delivery.status == DeliveryStatus.failed
+    assert "STARTTLS" in delivery.last_error
+    assert "AUTH" not in server.commands
@@ -0,0 +1,30 @@
+import os
+
+from src.mail.templates import EmailTemplate, render_email
+
+
+def test_login_and_invite_are_rendered():
+    login = render_email("login", auth_url="https://benefits.example.com/auth/abc")
+    invite = render_email("invite", auth_url="https://benefits.example.com/auth/def", invite_from="hr@example.com")
+    assert "https://benefits.example.com/auth/abc" in login and "${" not in login
+    assert "https://benefits.example.com/auth/def" in invite and "hr@example.com" in invite
+
+
+def test_values_are_substituted_once(tmp_path):
+    path = tmp_path / "mail.html"
+    path.write_text("<a href='${auth_url}'>${auth_url}</a>", encoding="utf-8")
+    # a value that looks like a placeholder is not expanded again
+    assert EmailTemplate(path).render(auth_url="${invite_from}") == "<a href='${invite_from}'>${invite_from}</a>"
+
+
+def test_template_is_compiled_once_and_reloaded_on_change(tmp_path):
+    path = tmp_path / "mail.html"
+    path.write_text("Hello ${name}", encoding="utf-8")
+    template = EmailTemplate(path)
+    compiled = template.load()
+    assert template.load() is compiled
+
+    path.write_text("Bye ${name}", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert template.render(name="Ann") == "Bye Ann"
@@ -0,0 +1,29 @@
+import uuid
+
+import pytest
+from starlette.testclient import TestClient
+
+from src.app import app
+from src.auth.models import User
+from src.auth.utils import get_current_admin
+
+
+@pytest.fixture
+def client():
+    # the lifespan is not run, no database or mail server is needed
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_metrics_require_authentication(client):
+    assert client.get("/metrics").status_code == 403
+
+
+def test_metrics_for_admin(client):
+    app.dependency_overrides[get_current_admin] = lambda: User(id=uuid.uuid4(), email="admin@example.com",
+                                                               email_verified=True, active_user=True, role_id=1)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    metrics = response.json()
+    assert {"requests", "sessions_opened", "max_sessions_per_request"} <= metrics["sessions"].keys()
+    assert {"size", "checked_out", "checkouts", "wait_timeouts"} <= metrics["pool"].keys()
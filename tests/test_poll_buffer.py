@@ -0,0 +1,171 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.analitycs.ingest import PollBuffer
+from src.analitycs.models import PollResults
+
+
+class FakeStore:
+    """Stands in for the multi-row insert, keeps (user_id, poll_id) unique."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.rows: dict = {}
+        self.batches: list[int] = []
+
+    async def write(self, batch: dict) -> dict:
+        self.batches.append(len(batch))
+        if self.fail:
+            raise ConnectionError("database is down")
+        inserted = {}
+        for key, poll_results in batch.items():
+            if key not in self.rows:
+                poll_results.id = len(self.rows) + 1
+                self.rows[key] = poll_results
+                inserted[key] = poll_results
+        return inserted
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(PollBuffer, "_write", staticmethod(store.write))
+    return store
+
+
+def answer(user_id: uuid.UUID | None = None, poll_id: int = 1) -> PollResults:
+    return PollResults(poll_id=poll_id, user_id=user_id or uuid.uuid4(), selected_benefits=[1], satisfaction_rate=5)
+
+
+def test_answers_are_written_in_one_batch(store):
+    async def run():
+        buffer = PollBuffer(batch_size=100, interval=10)
+        results = await asyncio.gather(*(buffer.submit(answer()) for _ in range(10)))
+        await buffer.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert store.batches == [10]
+    assert all(result is not None and result.id is not None for result in results)
+
+
+def test_submit_returns_after_the_write(store):
+    async def run():
+        buffer = PollBuffer(batch_size=100, interval=10)
+        submitted = asyncio.ensure_future(buffer.submit(answer()))
+        await asyncio.sleep(0)
+        acknowledged_early = submitted.done()
+        result = await submitted
+        await buffer.stop()
+        return acknowledged_early, result
+
+    acknowledged_early, result = asyncio.run(run())
+    assert not acknowledged_early
+    assert result.id is not None
+    assert len(store.rows) == 1
+
+
+def test_full_batch_is_flushed_without_waiting(store):
+    async def run():
+        buffer = PollBuffer(batch_size=3, interval=60000)
+        results = await asyncio.wait_for(asyncio.gather(*(buffer.submit(answer()) for _ in range(3))), 5)
+        await buffer.stop()
+        return results
+
+    assert all(result is not None for result in asyncio.run(run()))
+    assert store.batches == [3]
+
+
+def test_duplicate_answers_are_rejected(store):
+    user_id = uuid.uuid4()
+
+    async def run():
+        buffer = PollBuffer(batch_size=100, interval=10)
+        pending = await asyncio.gather(buffer.submit(answer(user_id)), buffer.submit(answer(user_id)))
+        stored = await buffer.submit(answer(user_id))
+        other_poll = await buffer.submit(answer(user_id, poll_id=2))
+        await buffer.stop()
+        return pending, stored, other_poll
+
+    pending, stored, other_poll = asyncio.run(run())
+    assert pending[0] is not None and pending[1] is None
+    assert stored is None
+    assert other_poll is not None
+    assert len(store.rows) == 2
+
+
+def test_write_errors_reach_the_submitter(monkeypatch):
+    store = FakeStore(fail=True)
+    monkeypatch.setattr(PollBuffer, "_write", staticmethod(store.write))
+
+    async def run():
+        buffer = PollBuffer(batch_size=100, interval=10)
+        try:
+            return await asyncio.gather(buffer.submit(answer()), buffer.submit(answer()), return_exceptions=True)
+        finally:
+            await buffer.stop()
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_unbuffered_submit_writes_directly(store):
+    result = asyncio.run(PollBuffer(interval=0).submit(answer()))
+    assert result.id is not None
+    assert store.batches == [1]
+
+
+def test_stop_finishes_the_batch_in_flight(monkeypatch):
+    store = FakeStore()
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_write(batch):
+        started.set()
+        await release.wait()
+        return await store.write(batch)
+
+    monkeypatch.setattr(PollBuffer, "_write", staticmethod(slow_write))
+
+    async def run():
+        buffer = PollBuffer(batch_size=2, interval=60000)
+        submitted = [asyncio.ensure_future(buffer.submit(answer())) for _ in range(3)]
+        await started.wait()
+        stopping = asyncio.ensure_future(buffer.stop())
+        await asyncio.sleep(0)
+        release.set()
+        await stopping
+        return await asyncio.gather(*submitted, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, PollResults) for result in results)
+    assert store.batches == [2, 1]
+
+
+def test_stop_flushes_waiting_answers(store):
+    async def run():
+        buffer = PollBuffer(batch_size=100, interval=60000)
+        submitted = asyncio.ensure_future(buffer.submit(answer()))
+        await asyncio.sleep(0)
+        await buffer.stop()
+        return await submitted
+
+    assert asyncio.run(run()).id is not None
+    assert store.batches == [1]
+
+
+def test_write_errors_are_logged(monkeypatch, caplog):
+    store = FakeStore(fail=True)
+    monkeypatch.setattr(PollBuffer, "_write", staticmethod(store.write))
+
+    async def run():
+        buffer = PollBuffer(batch_size=100, interval=10)
+        try:
+            await buffer.submit(answer())
+        except ConnectionError:
+            pass
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert "Batch of 1 poll answers could not be written" in caplog.text
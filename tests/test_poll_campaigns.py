@@ -0,0 +1,28 @@
+import datetime
+
+from src.analitycs.models import PollCampaignCreate, PollCampaign
+
+
+def test_aware_dates_are_converted_to_local_time():
+    start = datetime.datetime(2026, 5, 1, 9, 0, tzinfo=datetime.timezone.utc)
+    campaign = PollCampaignCreate.model_validate({"name": "May", "start_date": "2026-05-01T09:00:00Z",
+                                                  "end_date": "2026-06-01T09:00:00+05:00"})
+    assert campaign.start_date.tzinfo is None
+    assert campaign.start_date == start.astimezone().replace(tzinfo=None)
+    assert campaign.end_date.tzinfo is None
+    # comparable with the naive default used when start_date is omitted
+    assert campaign.end_date > datetime.datetime(2026, 5, 1)
+
+
+def test_naive_dates_are_kept():
+    campaign = PollCampaignCreate(name="May", start_date=datetime.datetime(2026, 5, 1, 9, 0))
+    assert campaign.start_date == datetime.datetime(2026, 5, 1, 9, 0)
+    assert campaign.end_date is None
+
+
+def test_is_running():
+    campaign = PollCampaign(name="May", start_date=datetime.datetime(2026, 5, 1),
+                            end_date=datetime.datetime(2026, 6, 1))
+    assert campaign.is_running(datetime.datetime(2026, 5, 15))
+    assert not campaign.is_running(datetime.datetime(2026, 6, 1))
+    assert not campaign.is_running(datetime.datetime(2026, 4, 30))
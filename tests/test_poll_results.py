@@ -0,0 +1,32 @@
+import asyncio
+import uuid
+
+from src.analitycs import utils
+from src.analitycs.models import PollCampaign, PollSchema
+
+
+class ClosingSession:
+    closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def test_request_connection_is_released_before_the_buffer_waits(monkeypatch):
+    session = ClosingSession()
+    released = []
+
+    async def validate_poll_results(poll_data, session):
+        return PollCampaign(id=7, name="Spring")
+
+    async def submit(poll_results):
+        released.append(session.closed)
+        return poll_results
+
+    monkeypatch.setattr(utils, "validate_poll_results", validate_poll_results)
+    monkeypatch.setattr(utils.poll_buffer, "submit", submit)
+    poll_data = PollSchema(selected_benefits=[1], satisfaction_rate=5)
+
+    poll_results = asyncio.run(utils.add_poll_results(poll_data, str(uuid.uuid4()), session))
+    assert released == [True]
+    assert poll_results.poll_id == 7
@@ -0,0 +1,79 @@
+import datetime
+import uuid
+
+import pytest
+from sqlalchemy import text
+from starlette.exceptions import HTTPException
+
+from src.analitycs import ingest, utils
+from src.analitycs.ingest import PollBuffer
+from src.analitycs.models import PollCampaignCreate, PollSchema, PollCampaign
+from src.analitycs.utils import start_campaign, add_poll_results, validate_poll_results, set_current_poll_status, \
+    poll_cache
+from src.auth.models import User
+from src.benefits.models import BenefitBase, Benefit
+from src.benefits.utils import add_benefit
+
+
+@pytest.fixture
+def benefits(db, session_maker, monkeypatch):
+    monkeypatch.setattr(ingest, "async_session_maker", session_maker)
+    monkeypatch.setattr(utils, "poll_buffer", PollBuffer(interval=0))
+    poll_cache.invalidate()
+    benefits = [Benefit(name="Gym"), Benefit(name="Pool"), Benefit(name="Car")]
+    db.add(*benefits)
+    yield [benefit.id for benefit in benefits]
+    poll_cache.invalidate()
+
+
+def answer(selected_benefits: list[int], satisfaction_rate: int = 4) -> PollSchema:
+    return PollSchema(selected_benefits=selected_benefits, satisfaction_rate=satisfaction_rate)
+
+
+def rejected(db, poll_data: PollSchema) -> str:
+    with pytest.raises(HTTPException) as error:
+        db.run(lambda session: validate_poll_results(poll_data, session))
+    assert error.value.status_code == 400
+    return error.value.detail
+
+
+def test_closed_poll_takes_no_answers(db, benefits):
+    assert rejected(db, answer(benefits[:1])) == "Poll is currently inactive"
+
+
+def test_answers_are_checked_against_the_campaign(db, benefits):
+    gym, pool, car = benefits
+    db.run(lambda session: start_campaign(PollCampaignCreate(name="Spring", benefits=[gym, pool]), session))
+    assert db.run(lambda session: validate_poll_results(answer([gym, pool]), session)).name == "Spring"
+    assert rejected(db, answer([car])) == "Invalid benefit id"
+    assert rejected(db, answer([gym], satisfaction_rate=6)) == "Invalid satisfaction_rate"
+
+
+def test_open_poll_accepts_benefits_added_later(db, benefits):
+    db.run(lambda session: set_current_poll_status(True, session))
+    assert rejected(db, answer([999])) == "Invalid benefit id"
+    spa = db.run(lambda session: add_benefit(BenefitBase(name="Spa"), session))
+    db.run(lambda session: validate_poll_results(answer([spa.id]), session))
+
+
+def test_answers_land_in_the_campaign_partition(db, benefits):
+    user = User(id=uuid.uuid4(), email="user@example.com", email_verified=True, active_user=True, role_id=2)
+    db.add(user)
+    campaign = db.run(lambda session: start_campaign(PollCampaignCreate(name="Spring"), session))
+
+    stored = db.run(lambda session: add_poll_results(answer(benefits[:2]), str(user.id), session))
+    assert stored.id is not None and stored.poll_id == campaign.id
+    with pytest.raises(HTTPException) as error:
+        db.run(lambda session: add_poll_results(answer(benefits[:1]), str(user.id), session))
+    assert error.value.status_code == 409
+
+    partitions = db.all(text("SELECT tableoid::regclass::text, count(*) FROM poll_results GROUP BY 1"))
+    assert partitions == [(f"poll_results_{campaign.id}", 1)]
+
+
+def test_starting_a_campaign_ends_the_previous_one(db, benefits):
+    first = db.run(lambda session: start_campaign(PollCampaignCreate(name="Spring"), session))
+    second = db.run(lambda session: start_campaign(PollCampaignCreate(name="Autumn"), session))
+    assert db.run(lambda session: utils.get_current_campaign(session)).id == second.id
+    ended = db.run(lambda session: session.get(PollCampaign, first.id))
+    assert ended.end_date is not None and ended.end_date <= datetime.datetime.now()
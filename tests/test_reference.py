@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from src import reference as reference_module
+from src.benefits.models import Category
+from src.reference import ReferenceData, run_reference_refresh
+
+
+def test_registry_is_loaded_once_and_swapped_on_refresh(db):
+    registry = ReferenceData()
+    loaded = db.run(registry.load)
+    assert dict(loaded.statuses) == {1: "в обработке", 2: "одобрена", 3: "отклонена", 4: "завершена"}
+    assert dict(loaded.roles) == {1: "HR", 2: "employee"}
+    assert dict(loaded.categories) == {}
+    statuses = registry.statuses
+
+    db.add(Category(name="Starter"))
+    db.run(registry.load)
+    assert registry.statuses is statuses and dict(registry.categories) == {}
+
+    db.run(registry.refresh)
+    assert [category.name for category in registry.categories.values()] == ["Starter"]
+    with pytest.raises(TypeError):
+        registry.statuses[5] = "архив"
+
+    registry.invalidate()
+    assert db.run(lambda session: registry.status_name(2, session)) == "одобрена"
+
+
+def test_refresh_errors_are_logged_and_retried(monkeypatch, caplog):
+    attempts = []
+
+    def session_maker():
+        attempts.append(1)
+        if len(attempts) == 2:
+            raise asyncio.CancelledError
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(reference_module, "REFERENCE_REFRESH_INTERVAL", 0)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(run_reference_refresh(session_maker))
+    assert len(attempts) == 2
+    assert "Reference data could not be refreshed" in caplog.text
+    assert "database is down" in caplog.text
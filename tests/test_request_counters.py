@@ -0,0 +1,62 @@
+import uuid
+
+import pytest
+from sqlmodel import select
+
+from src.analitycs.models import BenefitRequestStats, UserRequestStats
+from src.analitycs.utils import get_analytics
+from src.auth.models import User
+from src.benefit_requests.models import UserBenefitRelation
+from src.benefit_requests.utils import validate_benefit_request, change_request_status
+from src.benefits.models import Benefit
+from src.benefits.utils import delete_benefit
+
+
+@pytest.fixture
+def people(db):
+    users = [User(id=uuid.uuid4(), email=f"{name}@example.com", email_verified=True, active_user=True, role_id=2)
+             for name in ("ann", "bob", "carl")]
+    benefits = [Benefit(name="Gym", need_confirmation=True), Benefit(name="Pool", need_confirmation=True)]
+    db.add(*users, *benefits)
+    return users, benefits
+
+
+def request(db, user: User, benefit: Benefit) -> int:
+    db.run(lambda session: validate_benefit_request(benefit.id, None, session, user))
+    return db.all(select(UserBenefitRelation.id).order_by(UserBenefitRelation.id.desc()))[0]
+
+
+def counters(db) -> dict[tuple[int, int], int]:
+    stats = db.all(select(BenefitRequestStats.benefit_id, BenefitRequestStats.status, BenefitRequestStats.count))
+    return {(benefit_id, request_status): count for benefit_id, request_status, count in stats if count != 0}
+
+
+def test_counters_follow_requests(db, people):
+    (ann, bob, carl), (gym, pool) = people
+    approved = request(db, ann, gym)
+    denied = request(db, bob, gym)
+    request(db, ann, pool)
+    db.run(lambda session: change_request_status(approved, 2, session))
+    db.run(lambda session: change_request_status(denied, 3, session))
+    db.run(lambda session: change_request_status(denied, 3, session))
+
+    assert counters(db) == {(gym.id, 2): 1, (gym.id, 3): 1, (pool.id, 1): 1}
+    assert dict(db.all(select(UserRequestStats.user_id, UserRequestStats.requests))) == {ann.id: 2, bob.id: 1}
+
+    analytics = db.run(get_analytics)
+    assert analytics["бенефиты"] == {"Gym": {"Ожидает": 0, "Одобрено": 1, "Отказано": 1},
+                                     "Pool": {"Ожидает": 1, "Одобрено": 0, "Отказано": 0}}
+    assert (analytics["заявки_всего"], analytics["пользуются_бенефитами"], analytics["все_сотрудники"]) == (3, 2, 3)
+
+
+def test_deleting_a_benefit_drops_its_users(db, people):
+    (ann, bob, carl), (gym, pool) = people
+    request(db, ann, gym)
+    request(db, bob, gym)
+    request(db, ann, pool)
+
+    db.run(lambda session: delete_benefit(gym.id, session))
+
+    assert counters(db) == {(pool.id, 1): 1}
+    assert dict(db.all(select(UserRequestStats.user_id, UserRequestStats.requests))) == {ann.id: 1, bob.id: 0}
+    assert db.run(get_analytics)["пользуются_бенефитами"] == 1
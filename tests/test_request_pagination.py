@@ -0,0 +1,124 @@
+import datetime
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from starlette.testclient import TestClient
+
+from src.admin import router as admin_router
+from src.admin.models import UserInfoTable
+from src.app import app
+from src.auth import router as auth_router
+from src.auth.models import User
+from src.auth.utils import get_current_admin, get_current_user
+from src.benefit_requests import utils as request_utils
+from src.benefit_requests.models import UserBenefitRelation, RequestFilters
+from src.benefit_requests.utils import encode_cursor, decode_cursor, get_all_requests
+from src.benefits.models import Benefit
+from src.database import get_session
+
+USER = User(id=uuid.uuid4(), email="admin@example.com", email_verified=True, active_user=True, role_id=1)
+
+
+def test_cursor_round_trip():
+    created_at = datetime.datetime(2024, 3, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor(datetime.datetime.now(), 1)[:-4],
+                                    "MjAyNC0wMy0wMQ=="])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def get_all_requests(sort_by_date_desc, session, filters, limit, cursor, with_total):
+        calls.append((limit, cursor, with_total))
+        return {"requests": [], "next_cursor": None, "total": None, "total_is_estimate": None}
+
+    async def get_user_requests_by_id(user_id, session, request_status, limit, cursor):
+        calls.append((limit, cursor))
+        return {"requests": [], "next_cursor": None}
+
+    monkeypatch.setattr(admin_router, "get_all_requests", get_all_requests)
+    monkeypatch.setattr(auth_router, "get_user_requests_by_id", get_user_requests_by_id)
+    app.dependency_overrides[get_session] = lambda: None
+    app.dependency_overrides[get_current_admin] = lambda: USER
+    app.dependency_overrides[get_current_user] = lambda: USER
+    yield TestClient(app), calls
+    app.dependency_overrides.clear()
+
+
+def test_admin_requests_are_paged_by_default(client):
+    client, calls = client
+    assert client.get("/admin/requests").status_code == 200
+    assert client.get("/admin/requests", params={"cursor": "abc", "with_total": True}).status_code == 200
+    assert calls == [(50, None, False), (50, "abc", True)]
+    assert client.get("/admin/requests", params={"limit": 501}).status_code == 422
+
+
+def test_user_requests_are_paged_by_default(client):
+    client, calls = client
+    assert client.get("/users/requests").status_code == 200
+    assert calls == [(50, None)]
+    assert client.get("/users/requests", params={"limit": 101}).status_code == 422
+
+
+def add_requests(db, count: int) -> list[int]:
+    """Creates count requests sharing two timestamps, returns their ids oldest first."""
+    user = User(id=uuid.uuid4(), email="user@example.com", email_verified=True, active_user=True, role_id=2)
+    benefit = Benefit(name="Gym")
+    db.add(user, benefit)
+    db.add(UserInfoTable(user_id=user.id, full_name="Ann Smith"))
+    created_at = [datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2)]
+    requests = [UserBenefitRelation(user_id=user.id, benefit_id=benefit.id, status=1,
+                                    created_at=created_at[number * 2 // count]) for number in range(count)]
+    db.add(*requests)
+    # ties on created_at are ordered by id
+    return [request.id for request in sorted(requests, key=lambda request: (request.created_at, request.id))]
+
+
+def walk(db, sort_by_date_desc: bool, limit: int) -> list[dict]:
+    pages, cursor = [], None
+    while True:
+        page = db.run(lambda session: get_all_requests(sort_by_date_desc, session, None, limit, cursor))
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("sort_by_date_desc", [True, False])
+def test_pages_cover_every_request_once(db, sort_by_date_desc):
+    ids = add_requests(db, 7)
+    pages = walk(db, sort_by_date_desc, 2)
+    assert [len(page["requests"]) for page in pages] == [2, 2, 2, 1]
+    listed = [request["request_id"] for page in pages for request in page["requests"]]
+    assert listed == (ids[::-1] if sort_by_date_desc else ids)
+
+
+def test_total_is_counted_for_the_first_page_only(db):
+    add_requests(db, 4)
+    first, second = walk(db, True, 2)
+    assert (first["total"], first["total_is_estimate"]) == (4, False)
+    assert second["total"] is None
+    cursor = first["next_cursor"]
+    page = db.run(lambda session: get_all_requests(True, session, None, 2, cursor, with_total=True))
+    assert page["total"] == 4
+
+
+def test_exact_page_has_no_next_cursor(db):
+    add_requests(db, 4)
+    assert [page["next_cursor"] is None for page in walk(db, True, 4)] == [True]
+
+
+def test_large_totals_are_capped(db, monkeypatch):
+    monkeypatch.setattr(request_utils, "REQUESTS_COUNT_LIMIT", 3)
+    add_requests(db, 5)
+    page = db.run(lambda session: get_all_requests(True, session, RequestFilters(status=1), 2))
+    assert (page["total"], page["total_is_estimate"]) == (3, True)
@@ -0,0 +1,51 @@
+import asyncio
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.database import RequestSession
+
+
+def run_sessions(database_url: str, *uses) -> list[int]:
+    """Runs each use in its own request session, returns the checkouts each one made."""
+    async def run():
+        engine = create_async_engine(database_url, pool_size=2)
+        checkouts = []
+        event.listen(engine.sync_engine, "checkout", lambda *args: checkouts.append(1))
+        session_maker = async_sessionmaker(engine, class_=AsyncSession, sync_session_class=RequestSession,
+                                           expire_on_commit=False)
+        counts = []
+        try:
+            for use in uses:
+                before = len(checkouts)
+                async with session_maker() as session:
+                    await use(session)
+                counts.append(len(checkouts) - before)
+            assert engine.sync_engine.pool.checkedout() == 0
+        finally:
+            await engine.dispose()
+        return counts
+
+    return asyncio.run(run())
+
+
+async def unused(session):
+    pass
+
+
+async def two_transactions(session):
+    await session.exec(text("SELECT 1"))
+    await session.commit()
+    await session.exec(text("SELECT 2"))
+    await session.commit()
+
+
+async def closed_midway(session):
+    await session.exec(text("SELECT 1"))
+    await session.close()
+    await session.exec(text("SELECT 2"))
+
+
+def test_connection_is_checked_out_lazily_and_once(database_url):
+    assert run_sessions(database_url, unused, two_transactions, closed_midway) == [0, 1, 2]
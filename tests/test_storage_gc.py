@@ -0,0 +1,82 @@
+import datetime
+import os
+import time
+
+import pytest
+from sqlmodel import select
+
+from src.benefits.models import Benefit
+from src.storage import utils
+from src.storage.backends import LocalStorage
+from src.storage.models import StoredFile
+from src.storage.utils import collect_garbage, COVERS, RECEIPTS
+
+OLD = datetime.datetime.now() - datetime.timedelta(days=1)
+OLD_NAME = "a" * 64 + ".png"
+LIVE_NAME = "b" * 64 + ".png"
+NEW_NAME = "c" * 64 + ".png"
+ORPHAN_NAME = "d" * 64 + ".png"
+FRESH_ORPHAN_NAME = "e" * 64 + ".png"
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storages = {namespace: LocalStorage(namespace, tmp_path) for namespace in (COVERS, RECEIPTS)}
+    monkeypatch.setattr(utils, "get_storage", storages.get)
+    monkeypatch.setattr(utils, "STORAGE_GC_GRACE", 3600)
+    return storages[COVERS]
+
+
+def put_blob(storage: LocalStorage, name: str, age: float = 0):
+    path = storage.path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"blob")
+    modified_at = time.time() - age
+    os.utime(path, (modified_at, modified_at))
+
+
+async def collect(session):
+    await collect_garbage(session)
+    await session.commit()
+
+
+def stored_files(db) -> dict[str, int]:
+    return dict(db.all(select(StoredFile.name, StoredFile.ref_count).where(StoredFile.namespace == COVERS)))
+
+
+def remaining_blobs(db, storage: LocalStorage) -> list[str]:
+    return sorted(name for name, _ in db.run(lambda session: storage.list_names()))
+
+
+@pytest.fixture
+def covers(db, storage):
+    db.add(StoredFile(namespace=COVERS, name=OLD_NAME, size=4, ref_count=1, created_at=OLD),
+           StoredFile(namespace=COVERS, name=LIVE_NAME, size=4, ref_count=0, created_at=OLD),
+           StoredFile(namespace=COVERS, name=NEW_NAME, size=4, ref_count=0, created_at=datetime.datetime.now()),
+           Benefit(name="Gym", cover_path=LIVE_NAME),
+           Benefit(name="Pool", cover_path=LIVE_NAME))
+    for name in (OLD_NAME, LIVE_NAME, NEW_NAME, ORPHAN_NAME):
+        put_blob(storage, name, 86400)
+    put_blob(storage, FRESH_ORPHAN_NAME)
+
+
+def test_unreferenced_blobs_are_collected_after_grace(db, storage, covers):
+    db.run(collect)
+
+    assert stored_files(db) == {LIVE_NAME: 2, NEW_NAME: 0}
+    # the orphan past the grace period goes, the fresh one stays
+    assert remaining_blobs(db, storage) == sorted([LIVE_NAME, NEW_NAME, FRESH_ORPHAN_NAME])
+
+
+def test_rows_locked_by_an_upload_are_skipped(db, storage, covers):
+    async def collect_during_upload(session):
+        # an upload taking a new reference holds the row lock until it commits
+        await session.exec(select(StoredFile).where(StoredFile.name == OLD_NAME).with_for_update())
+        async with db.session_maker() as gc_session:
+            await collect(gc_session)
+        await session.rollback()
+
+    db.run(collect_during_upload)
+
+    assert stored_files(db) == {OLD_NAME: 1, LIVE_NAME: 2, NEW_NAME: 0}
+    assert OLD_NAME in remaining_blobs(db, storage)
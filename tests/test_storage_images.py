@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+from src.storage import images
+from src.storage.exceptions import InvalidImage
+from src.storage.images import render_cover, make_cover, shutdown_image_workers
+
+DIGEST = "a" * 64
+GPS_IFD = 0x8825
+ORIENTATION = 0x0112
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "photo.jpg"
+    image = Image.new("RGB", (400, 200), "red")
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[GPS_IFD] = {1: "N", 2: (56.0, 50.0, 0.0)}
+    image.save(path, "JPEG", exif=exif, comment=b"private")
+    return path
+
+
+def test_render_cover_strips_metadata(photo, tmp_path):
+    target = tmp_path / "cover"
+    render_cover(str(photo), str(target), DIGEST, [], [])
+    with Image.open(target) as image:
+        assert image.format == "JPEG"
+        assert not image.getexif()
+        assert "exif" not in image.info and "comment" not in image.info
+        # the orientation is applied to the pixels before it is dropped
+        assert image.size == (200, 400)
+
+
+def test_render_cover_variants(photo, tmp_path):
+    target = tmp_path / "cover"
+    variants = render_cover(str(photo), str(target), DIGEST, [100, 1000], ["webp"])
+    assert [name for name, _ in variants] == [f"{DIGEST}-100.webp", f"{DIGEST}-1000.webp"]
+    with Image.open(variants[0][1]) as image:
+        assert image.size == (100, 200)
+        assert not image.getexif()
+    with Image.open(variants[1][1]) as image:
+        assert image.size == (200, 400)
+
+
+def test_render_cover_keeps_transparency(tmp_path):
+    source = tmp_path / "logo.png"
+    Image.new("RGBA", (10, 10), (0, 0, 0, 0)).save(source, "PNG")
+    target = tmp_path / "cover"
+    render_cover(str(source), str(target), DIGEST, [], [])
+    with Image.open(target) as image:
+        assert image.mode == "RGBA"
+        assert image.getpixel((0, 0))[3] == 0
+
+
+def test_make_cover_in_worker_process(photo, tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "COVER_VARIANT_WIDTHS", [100])
+    monkeypatch.setattr(images, "COVER_VARIANT_FORMATS", ["webp"])
+    target = tmp_path / "cover"
+    try:
+        variants = asyncio.run(make_cover(photo, target, DIGEST))
+    finally:
+        shutdown_image_workers()
+    assert [name for name, _ in variants] == [f"{DIGEST}-100.webp"]
+    assert target.is_file()
+
+
+def test_make_cover_rejects_non_images(tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("not an image")
+    try:
+        with pytest.raises(InvalidImage):
+            asyncio.run(make_cover(source, tmp_path / "cover", DIGEST))
+    finally:
+        shutdown_image_workers()
+
+
+def test_render_cover_raises_variant_failures(photo, tmp_path):
+    with pytest.raises(KeyError):
+        render_cover(str(photo), str(tmp_path / "cover"), DIGEST, [100], ["nosuchformat"])
+
+
+def test_make_cover_logs_variant_failures(photo, tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(images, "COVER_VARIANT_WIDTHS", [100])
+    monkeypatch.setattr(images, "supported_formats", lambda: ["nosuchformat"])
+    try:
+        with pytest.raises(KeyError):
+            asyncio.run(make_cover(photo, tmp_path / "cover", DIGEST))
+    finally:
+        shutdown_image_workers()
+    assert f"Variants of cover {DIGEST} could not be rendered" in caplog.text
@@ -0,0 +1,64 @@
+import pytest
+from starlette.requests import Request
+
+from src.storage.responses import _byte_range, file_response, REVALIDATE
+
+ETAG = '"abc"'
+
+
+def make_request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=10-", (10, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-200", (0, 99)),
+    ("bytes=5-5", (5, 5)),
+])
+def test_byte_range(header, expected):
+    assert _byte_range(make_request(range=header), ETAG, 100) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=9-0", "bytes=-", "bytes=0-9,20-29", "items=0-9", "bytes=a-b"])
+def test_invalid_range_is_ignored(header):
+    assert _byte_range(make_request(range=header), ETAG, 100) is None
+
+
+def test_range_without_header():
+    assert _byte_range(make_request(), ETAG, 100) is None
+
+
+def test_if_range_mismatch_ignores_range():
+    assert _byte_range(make_request(range="bytes=0-9", if_range='"other"'), ETAG, 100) is None
+    assert _byte_range(make_request(range="bytes=0-9", if_range=ETAG), ETAG, 100) == (0, 9)
+
+
+@pytest.fixture
+def blob(tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(bytes(range(100)))
+    return path
+
+
+@pytest.mark.parametrize("header, status_code", [
+    ("bytes=0-9", 206),
+    ("bytes=9-0", 200),
+    ("bytes=100-", 416),
+    ("bytes=-0", 416),
+])
+def test_file_response_status(blob, header, status_code):
+    response = file_response(make_request(range=header), blob, ETAG, REVALIDATE)
+    assert response.status_code == status_code
+    if status_code == 416:
+        assert response.headers["content-range"] == "bytes */100"
+    if status_code == 206:
+        assert response.headers["content-range"] == "bytes 0-9/100"
+        assert response.headers["content-length"] == "10"
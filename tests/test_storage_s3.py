@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+
+import pytest
+from botocore.stub import ANY, Stubber
+from starlette.requests import Request
+
+from src.storage import backends
+from src.storage.backends import S3Storage
+
+NAME = "ab" + "c" * 62 + ".png"
+KEY = f"benefit_covers/ab/cc/{NAME}"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setattr(backends, "S3_BUCKET", "benefits")
+    monkeypatch.setattr(backends, "S3_ENDPOINT_URL", None)
+    monkeypatch.setattr(backends, "S3_ACCESS_KEY", "access")
+    monkeypatch.setattr(backends, "S3_SECRET_KEY", "secret")
+    monkeypatch.setattr(backends, "S3_REGION", "us-east-1")
+    storage = S3Storage("benefit_covers")
+    with Stubber(storage.client) as stubber:
+        yield storage, stubber
+        stubber.assert_no_pending_responses()
+
+
+def test_put_uploads_and_removes_temp_file(s3):
+    storage, stubber = s3
+    stubber.add_response("put_object", {}, {"Bucket": "benefits", "Key": KEY, "Body": ANY, "ChecksumAlgorithm": ANY})
+    source = storage.temp_path()
+    source.write_bytes(b"cover")
+
+    asyncio.run(storage.put(NAME, source))
+
+    assert not source.exists()
+
+
+def test_exists(s3):
+    storage, stubber = s3
+    stubber.add_response("head_object", {}, {"Bucket": "benefits", "Key": KEY})
+    stubber.add_client_error("head_object", "404", http_status_code=404,
+                             expected_params={"Bucket": "benefits", "Key": KEY})
+
+    assert asyncio.run(storage.exists(NAME)) is True
+    assert asyncio.run(storage.exists(NAME)) is False
+
+
+def test_delete(s3):
+    storage, stubber = s3
+    stubber.add_response("delete_object", {}, {"Bucket": "benefits", "Key": KEY})
+
+    asyncio.run(storage.delete(NAME))
+
+
+def test_list_names_strips_the_prefix(s3):
+    storage, stubber = s3
+    modified_at = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    stubber.add_response("list_objects_v2",
+                         {"Contents": [{"Key": KEY, "LastModified": modified_at},
+                                       {"Key": "benefit_covers/legacy.png", "LastModified": modified_at}]},
+                         {"Bucket": "benefits", "Prefix": "benefit_covers/"})
+
+    assert asyncio.run(storage.list_names()) == [(NAME, modified_at.timestamp()),
+                                                 ("legacy.png", modified_at.timestamp())]
+
+
+def test_response_redirects_to_presigned_url(s3):
+    storage, _ = s3
+    request = Request({"type": "http", "method": "GET", "headers": []})
+
+    response = asyncio.run(storage.response(NAME, request, "public, max-age=31536000, immutable"))
+
+    assert response.status_code == 307
+    assert response.headers["location"].startswith(f"https://benefits.s3.amazonaws.com/{KEY}?")
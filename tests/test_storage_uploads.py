@@ -0,0 +1,49 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from src.storage import utils
+from src.storage.exceptions import FileTooLarge
+from src.storage.utils import save_upload
+
+
+class ChunkRecorder(io.BytesIO):
+    def __init__(self, content: bytes):
+        super().__init__(content)
+        self.reads: list[int] = []
+
+    def read(self, size: int = -1) -> bytes:
+        self.reads.append(size)
+        return super().read(size)
+
+
+@pytest.fixture(autouse=True)
+def chunk_size(monkeypatch):
+    monkeypatch.setattr(utils, "UPLOAD_CHUNK_SIZE", 4)
+
+
+def test_upload_is_copied_in_chunks(tmp_path):
+    content = b"0123456789"
+    source = ChunkRecorder(content)
+    target = tmp_path / "blob"
+
+    size, digest = asyncio.run(save_upload(UploadFile(source, filename="receipt.png"), target))
+
+    assert (size, digest) == (10, hashlib.sha256(content).hexdigest())
+    assert target.read_bytes() == content
+    assert source.reads == [4, 4, 4, 4]
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_upload_over_the_limit_is_rejected_and_removed(tmp_path):
+    source = ChunkRecorder(b"x" * 100)
+
+    with pytest.raises(FileTooLarge):
+        asyncio.run(save_upload(UploadFile(source, filename="huge.png"), tmp_path / "blob", max_size=10))
+
+    # reading stops at the chunk that crosses the limit
+    assert source.reads == [4, 4, 4]
+    assert list(tmp_path.iterdir()) == []
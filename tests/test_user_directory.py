@@ -0,0 +1,46 @@
+import uuid
+
+import pytest
+
+from src.admin.models import UserInfoTable
+from src.admin.utils import get_users
+from src.auth.models import User
+
+
+@pytest.fixture
+def directory(db):
+    people = [
+        ("ann@example.com", "Ann Smith", "Engineer", "Moscow office", True),
+        ("bob@example.com", "Bob Brown", "Designer", "Remote", True),
+        ("carl_100@example.com", "Carl Green", "Smithing lead", "Kazan office", True),
+        ("dora@example.com", "Dora Smith", "Engineer", "Moscow office", False),
+    ]
+    for email, full_name, position, place, active in people:
+        user = User(id=uuid.uuid4(), email=email, email_verified=True, active_user=active, role_id=2)
+        db.add(user)
+        db.add(UserInfoTable(user_id=user.id, full_name=full_name, position=position, place_of_employment=place))
+
+
+def search(db, search: str | None = None, **kwargs) -> tuple[list[str], int]:
+    page = db.run(lambda session: get_users(session, search, **kwargs))
+    return [user.full_name for user in page["users"]], page["total"]
+
+
+@pytest.mark.parametrize("term, found", [
+    ("smith", ["Ann Smith", "Carl Green"]),
+    ("MOSCOW", ["Ann Smith"]),
+    ("bob@", ["Bob Brown"]),
+    ("_100", ["Carl Green"]),
+    ("%", []),
+    ("nobody", []),
+])
+def test_search_spans_profile_and_email(db, directory, term, found):
+    # Dora matches too but is deleted
+    assert search(db, term) == (found, len(found))
+
+
+def test_pages_report_the_full_total(db, directory):
+    assert search(db) == (["Ann Smith", "Bob Brown", "Carl Green"], 3)
+    assert search(db, limit=2) == (["Ann Smith", "Bob Brown"], 3)
+    assert search(db, limit=2, offset=2) == (["Carl Green"], 3)
+    assert search(db, sort_by="email", desc=True, limit=1) == (["Carl Green"], 3)
@@ -0,0 +1,46 @@
+import uuid
+
+import pytest
+from sqlmodel import select
+
+from src.admin import utils
+from src.admin.models import UserInfoTable
+from src.admin.utils import import_users, parse_users_csv
+from src.auth.models import User, AuthToken
+
+CSV = """email,full_name,position,administration
+new@example.com,Ann Smith,Engineer,false
+not-an-email,Bob Brown,Designer,false
+taken@example.com,Carl Green,Manager,false
+hr@example.com,Dora White,HR,true
+new@example.com,Ann Smith,Engineer,false
+""".encode()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    messages = []
+
+    async def send_emails(batch):
+        messages.extend(batch)
+
+    monkeypatch.setattr(utils, "send_emails", send_emails)
+    return messages
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(db, sent):
+    db.add(User(id=uuid.uuid4(), email="taken@example.com", email_verified=True, active_user=True, role_id=2))
+
+    result = db.run(lambda session: import_users(parse_users_csv(CSV), session, "admin@example.com"))
+
+    assert (result["created"], result["failed"]) == (2, 3)
+    statuses = [(row["row"], row["email"], row["status"]) for row in result["rows"]]
+    assert statuses == [(1, "new@example.com", "created"), (2, "not-an-email", "error"),
+                        (3, "taken@example.com", "error"), (4, "hr@example.com", "created"),
+                        (5, "new@example.com", "error")]
+    assert result["rows"][1]["detail"][0]["loc"] == ("email",)
+    users = dict(db.all(select(User.email, User.role_id).where(User.email != "taken@example.com")))
+    assert users == {"new@example.com": 2, "hr@example.com": 1}
+    assert len(db.all(select(UserInfoTable))) == 2
+    assert len(db.all(select(AuthToken))) == 2
+    assert sorted(message["To"] for message in sent) == ["hr@example.com", "new@example.com"]
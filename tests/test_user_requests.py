@@ -0,0 +1,57 @@
+import datetime
+import uuid
+
+import pytest
+
+from src.auth.models import User
+from src.benefit_requests.models import UserBenefitRelation
+from src.benefit_requests.utils import get_user_requests_by_id, get_user_requests_summary
+from src.benefits.models import Benefit
+
+
+@pytest.fixture
+def requests(db):
+    """Five requests of Ann in statuses 1, 2, 1, 3, 1, the newest last, and one of Bob."""
+    ann, bob = (User(id=uuid.uuid4(), email=f"{name}@example.com", email_verified=True, active_user=True, role_id=2)
+                for name in ("ann", "bob"))
+    gym = Benefit(name="Gym")
+    db.add(ann, bob, gym)
+    start = datetime.datetime(2024, 1, 1)
+    relations = [UserBenefitRelation(user_id=ann.id, benefit_id=gym.id, status=status,
+                                     created_at=start + datetime.timedelta(days=number // 2))
+                 for number, status in enumerate([1, 2, 1, 3, 1])]
+    db.add(*relations, UserBenefitRelation(user_id=bob.id, benefit_id=gym.id, status=1, created_at=start))
+    return ann, [relation.id for relation in relations]
+
+
+def pages(db, user_id: uuid.UUID, limit: int, request_status: int | None = None) -> list[list[int]]:
+    result, cursor = [], None
+    while True:
+        page = db.run(lambda session: get_user_requests_by_id(user_id, session, request_status, limit, cursor))
+        result.append([request["request_id"] for request in page["requests"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return result
+
+
+def test_own_requests_newest_first(db, requests):
+    ann, ids = requests
+    assert pages(db, ann.id, 2) == [[ids[4], ids[3]], [ids[2], ids[1]], [ids[0]]]
+    assert pages(db, ann.id, 5) == [ids[::-1]]
+
+
+def test_requests_filtered_by_status(db, requests):
+    ann, ids = requests
+    assert pages(db, ann.id, 2, request_status=1) == [[ids[4], ids[2]], [ids[0]]]
+    page = db.run(lambda session: get_user_requests_by_id(ann.id, session, 3))
+    assert [(request["request_id"], request["status"]) for request in page["requests"]] == \
+        [(ids[3], "Заявка отклонена")]
+
+
+def test_summary_counts_every_status(db, requests):
+    ann, ids = requests
+    assert db.run(lambda session: get_user_requests_summary(ann.id, session)) == {
+        "statuses": {"в обработке": 3, "одобрена": 1, "отклонена": 1, "завершена": 0},
+        "total": 5
+    }
+    assert db.run(lambda session: get_user_requests_summary(uuid.uuid4(), session))["total"] == 0